@@ -0,0 +1,192 @@
+"""
+Adaptive exploration of the knob space, for mapping regime boundaries.
+
+A uniform grid spends most of its runs inside flat regions. explore() starts
+from a space-filling design over box bounds on the knobs (Latin hypercube,
+or Sobol when SciPy is installed) and then spends every further round where
+the results move. Each point is linked to its nearest neighbours in the unit
+cube, and each link is scored by how much the target observables change
+along it, plus the ensemble CI width at its ends. New points go near the
+midpoints of the best links, so boundaries (the context-B margin collapsing,
+coupling crashing, majority runs shortening) get refined and flat regions
+are left alone. Runs go through blackboard_sweep, so they share its SQLite
+store, caching and resume.
+
+    bounds = {"mutate_prob_b": (0.001, 0.2, "log"), "erase_prob_b": (0.005, 0.1)}
+    rows = explore(bounds, "explore.db", replicates=50, n_initial=32, rounds=6, batch=16)
+    write_csv(rows, "phase_diagram.csv")
+
+Each row of the phase-diagram dataset is one point: its knobs, the round
+that added it, and the sweep's summary numbers (means and CI bounds per
+context).
+"""
+
+import csv
+
+import numpy as np
+
+import blackboard_engine as engine
+import blackboard_sweep as sweep
+
+# result columns whose changes mark a boundary (v3/v4: context B)
+TARGETS = ("avg_margin_b", "avg_coupling_b", "max_run_b")
+NEIGHBORS = 4       # links per point: its k nearest neighbours in the unit cube
+CI_WEIGHT = 0.5     # weight of the CI width next to the change along a link
+JITTER = 0.1        # new points land within ~JITTER x link length of the midpoint
+RESOLUTION = 0.01   # links shorter than this (unit cube) are not split further
+
+
+def _rng(seed):
+    return np.random.Generator(np.random.Philox(seed))
+
+
+def latin_hypercube(n, dims, rng):
+    # n points in [0, 1)^dims, exactly one in each of the n strata of every axis
+    u = (rng.random((n, dims)) + np.arange(n)[:, None]) / n
+    for d in range(dims):
+        u[:, d] = u[rng.permutation(n), d]
+    return u
+
+
+def sobol(n, dims, rng):
+    # scrambled Sobol points; n a power of two keeps the balance properties
+    try:
+        from scipy.stats import qmc
+    except ImportError:
+        raise ImportError("design='sobol' needs scipy; use design='lhs'") from None
+    return qmc.Sobol(dims, scramble=True, seed=rng).random(n)
+
+
+DESIGNS = {"lhs": latin_hypercube, "sobol": sobol}
+
+
+def _axes(bounds):
+    # knob -> (lo, hi, log); bounds are (lo, hi) or (lo, hi, "log")
+    axes = {}
+    for name, b in bounds.items():
+        lo, hi = b[0], b[1]
+        log = len(b) > 2 and b[2] == "log"
+        if not lo < hi or (log and lo <= 0):
+            raise ValueError(f"bad bounds for {name!r}: {b!r}")
+        axes[name] = (lo, hi, log)
+    return axes
+
+
+def to_params(u, axes):
+    # unit-cube rows -> knob dicts; int bounds give ints, floats keep 6 digits
+    points = []
+    for row in u:
+        p = {}
+        for x, (name, (lo, hi, log)) in zip(row, axes.items()):
+            v = np.exp(np.log(lo) + x * np.log(hi / lo)) if log else lo + x * (hi - lo)
+            p[name] = int(round(v)) if isinstance(lo, int) and isinstance(hi, int) \
+                else float(f"{v:.6g}")
+        points.append(p)
+    return points
+
+
+def to_unit(points, axes):
+    u = np.empty((len(points), len(axes)))
+    for d, (name, (lo, hi, log)) in enumerate(axes.items()):
+        v = np.array([p[name] for p in points], dtype=np.float64)
+        u[:, d] = np.log(v / lo) / np.log(hi / lo) if log else (v - lo) / (hi - lo)
+    return u
+
+
+def link_scores(u, y, ci, k=NEIGHBORS, ci_weight=CI_WEIGHT):
+    # links (i, j) between k-nearest neighbours, scored by the largest change of
+    # any target along them (targets scaled to their observed range) plus the CI width
+    n = len(u)
+    d = np.sqrt(((u[:, None] - u[None]) ** 2).sum(axis=-1))
+    np.fill_diagonal(d, np.inf)
+    nn = np.argsort(d, axis=1)[:, :min(k, n - 1)]
+    i = np.repeat(np.arange(n), nn.shape[1])
+    pairs = np.unique(np.sort(np.stack([i, nn.reshape(-1)], axis=1), axis=1), axis=0)
+    i, j = pairs.T
+    span = np.ptp(y, axis=0)
+    span[span == 0] = 1.0
+    change = np.nanmax(np.abs(y[i] - y[j]) / span, axis=1)
+    spread = np.nanmax((ci[i] + ci[j]) / 2 / span, axis=1)
+    return i, j, change + ci_weight * spread
+
+
+def propose(u, y, ci, batch, rng, resolution=RESOLUTION):
+    # up to `batch` new unit-cube points near the midpoints of the best links
+    i, j, score = link_scores(u, y, ci)
+    new = []
+    for link in np.argsort(-score, kind="stable"):
+        a, b = u[i[link]], u[j[link]]
+        length = np.linalg.norm(b - a)
+        if length < resolution:
+            continue
+        x = np.clip((a + b) / 2 + JITTER * length * rng.standard_normal(len(a)), 0.0, 1.0)
+        # keep away from every point so far, relative to the scale being refined
+        taken = np.vstack([u] + new) if new else u
+        if np.sqrt(((taken - x) ** 2).sum(axis=1)).min() < length / 4:
+            continue
+        new.append(x[None])
+        if len(new) == batch:
+            break
+    return np.vstack(new) if new else np.zeros((0, u.shape[1]))
+
+
+def _targets(rows, targets):
+    # (values, CI half-widths) of the targets present in the results
+    have = [t for t in targets if t in rows[0]]
+    if not have:
+        raise ValueError(f"none of the targets {targets} is in the results; "
+                         f"available: {sorted(k for k in rows[0] if k.endswith('_ci_low'))}")
+    y = np.array([[row.get(t, np.nan) for t in have] for row in rows], dtype=np.float64)
+    ci = np.array([[(row.get(f"{t}_ci_high", np.nan) - row.get(f"{t}_ci_low", np.nan)) / 2
+                    for t in have] for row in rows], dtype=np.float64)
+    return y, np.nan_to_num(ci)
+
+
+def explore(bounds, db_path, rules="v4", targets=TARGETS, n_initial=32, rounds=5, batch=16,
+            design="lhs", steps=engine.STEPS, mode="synchronous", replicates=20, seed=0,
+            workers=None, verbose=True, early_stop=False, resolution=RESOLUTION):
+    # initial design, then `rounds` rounds of up to `batch` points each; returns the rows
+    if design not in DESIGNS:
+        raise ValueError(f"unknown design {design!r}, expected one of {sorted(DESIGNS)}")
+    axes = _axes(bounds)
+    design_seed, propose_seed = np.random.SeedSequence(seed).spawn(2)
+    rng = _rng(propose_seed)
+
+    points = to_params(DESIGNS[design](n_initial, len(axes), _rng(design_seed)), axes)
+    rows, keys = [], set()
+    for rnd in range(rounds + 1):
+        if rnd:
+            y, ci = _targets(rows, targets)
+            new = propose(to_unit(rows, axes), y, ci, batch, rng, resolution)
+            points = to_params(new, axes)
+            if not points:
+                break
+        sweep.run_sweep(points, db_path, rules, steps, mode, replicates, seed, workers,
+                        verbose=verbose, early_stop=early_stop)
+        configs = [sweep.point_config(rules, p, steps, mode, replicates, seed, early_stop)
+                   for p in points]
+        fresh = [k for k in map(sweep.point_key, configs) if k not in keys]
+        keys.update(fresh)
+        for row in sweep.load_results(db_path, fresh):
+            row["round"] = rnd
+            rows.append(row)
+        if verbose:
+            print(f"explore: round {rnd}, {len(rows)} points")
+    return rows
+
+
+def write_csv(rows, path):
+    # the phase-diagram dataset, one line per point
+    fields = list(dict.fromkeys(k for row in rows for k in row))
+    with open(path, "w", newline="") as f:
+        w = csv.DictWriter(f, fields)
+        w.writeheader()
+        w.writerows(rows)
+
+
+if __name__ == "__main__":
+    import sys
+    db = sys.argv[1] if len(sys.argv) > 1 else "explore_results.db"
+    rows = explore({"mutate_prob_b": (0.001, 0.2, "log"), "erase_prob_b": (0.005, 0.1)},
+                   db, replicates=20)
+    write_csv(rows, db.rsplit(".", 1)[0] + ".csv")
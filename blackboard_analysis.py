@@ -0,0 +1,213 @@
+"""
+Vectorized analysis of whole blackboard trajectories.
+
+Every function takes arrays with time on `axis` (0 by default, the
+[step, replicate, ctx] layout of blackboard_trajectory) and works on all
+the other axes at once, so a 10^4-replicate ensemble is one call, not a
+Python loop per trace.
+
+- runs():                    run-length encoding of every series (value, start, length)
+- run_length_distribution(): histogram of run lengths per value, pooled over replicates
+- dwell_times():             mean run length per series and value
+- flip_counts(), flip_rate(): majority changes, and the boards' flip_rate EMA
+- autocorrelation(), autocorrelation_time(): FFT autocorrelation of e.g. the margin
+- regimes():                 per-window labels: contested / drifting / locked
+
+Runs that touch either end of the trace are censored (their true length is
+unknown). Dwell times and distributions leave them out unless asked.
+
+analyze() runs all of it on a Trajectory (or a dict of arrays) one batch of
+replicates at a time, so the traces never have to fit in RAM together:
+
+    traj = Trajectory("runs/v4.traj")
+    out = analyze(traj, window=100)
+    out["dwell"][:, 1]            # mean majority dwell time per replicate, context B
+    out["run_lengths"][1, 0]      # context B, runs of 0: counts by length
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from blackboard_engine import FLIP_DECAY, max_run
+
+REGIMES = ("contested", "drifting", "locked")
+LOCKED_MARGIN = 0.5       # window mean margin at or above this with no flips: locked
+CONTESTED_MARGIN = 0.2    # window mean margin below this: contested
+WINDOW = 100
+MAX_LAG = 100
+BATCH_BYTES = 1 << 28     # analyze(): working-set budget per batch of replicates
+FLIP_BLOCK_SCALE = 1e8    # flip_rate(): largest decay**-t within one block
+FLIP_LOOP_WIDTH = 512     # flip_rate(): series per step from which the step loop is faster
+
+Runs = namedtuple("Runs", "series value start length censored shape")
+
+
+def runs(x, axis=0):
+    # every run of equal consecutive values; series indexes np.ndindex(shape), the other axes
+    x = np.moveaxis(np.asarray(x), axis, -1)
+    shape, T = x.shape[:-1], x.shape[-1]
+    flat = x.reshape(-1, T)
+    new = np.ones(flat.shape, dtype=bool)
+    np.not_equal(flat[:, 1:], flat[:, :-1], out=new[:, 1:])
+    idx = np.flatnonzero(new)
+    series, start = np.divmod(idx, T)
+    # every series starts a run at t = 0, so the next start ends the current run
+    length = np.diff(idx, append=flat.size)
+    censored = (start == 0) | (start + length == T)
+    return Runs(series, flat.reshape(-1)[idx], start, length, censored, shape)
+
+
+def _n_values(r, n_values):
+    # values are 0..n_values-1; by default as many as the data shows
+    if n_values is None:
+        n_values = int(r.value.max()) + 1 if len(r.value) else 1
+    return n_values
+
+
+def run_length_distribution(x, axis=0, pool=(0,), max_len=None, censored=False, n_values=None):
+    # counts[kept..., value, length]: how many runs of each value had each length,
+    # summed over the `pool` axes (of the non-time axes; default the replicates)
+    r = runs(x, axis)
+    keep = [a for a in range(len(r.shape)) if a not in pool]
+    kept_shape = tuple(r.shape[a] for a in keep)
+    use = slice(None) if censored else ~r.censored
+    coords = np.unravel_index(r.series[use], r.shape)
+    kept = np.ravel_multi_index([coords[a] for a in keep], kept_shape) if keep \
+        else np.zeros(len(coords[0]) if coords else 0, dtype=np.intp)
+    n_values = _n_values(r, n_values)
+    max_len = max_len or (np.moveaxis(np.asarray(x), axis, -1).shape[-1])
+    length = np.minimum(r.length[use], max_len)
+    key = (kept * n_values + r.value[use]) * (max_len + 1) + length
+    size = int(np.prod(kept_shape, dtype=np.int64)) * n_values * (max_len + 1)
+    return np.bincount(key, minlength=size).reshape(kept_shape + (n_values, max_len + 1))
+
+
+def dwell_times(x, axis=0, censored=False, n_values=None):
+    # mean run length per series and value, shape (other axes..., value); nan without runs
+    r = runs(x, axis)
+    use = slice(None) if censored else ~r.censored
+    n_values = _n_values(r, n_values)
+    key = r.series[use] * n_values + r.value[use]
+    size = int(np.prod(r.shape, dtype=np.int64)) * n_values
+    total = np.bincount(key, weights=r.length[use], minlength=size)
+    count = np.bincount(key, minlength=size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (total / count).reshape(r.shape + (n_values,))
+
+
+def flip_counts(x, axis=0):
+    # number of value changes per series
+    x = np.moveaxis(np.asarray(x), axis, 0)
+    return (x[1:] != x[:-1]).sum(axis=0)
+
+
+def flip_rate(majority, axis=0, decay=FLIP_DECAY):
+    # the boards' flip_rate EMA at every step, from a trace of the instant majority
+    # (the majority after each step, as simulate() passes it to the trace), equal to
+    # the engine's up to rounding. The recurrence out[t] = decay * out[t-1] +
+    # (1 - decay) * flipped[t] runs step by step over wide traces (FLIP_LOOP_WIDTH
+    # series or more, where one step's array operations outweigh the loop overhead),
+    # and otherwise in closed form, decay**t * cumsum(... decay**-t), over blocks
+    # short enough that decay**-t stays below FLIP_BLOCK_SCALE.
+    m = np.moveaxis(np.asarray(majority), axis, 0)
+    # the flips, turned into the EMA in place
+    out = np.zeros(m.shape, dtype=np.float64)
+    np.not_equal(m[1:], m[:-1], out=out[1:], casting="unsafe")
+    if decay == 0:
+        return np.moveaxis(out, 0, axis)
+    T = len(m)
+    if out[0].size >= FLIP_LOOP_WIDTH:
+        out *= 1 - decay
+        carry = np.empty(m.shape[1:])
+        for t in range(1, T):
+            np.multiply(out[t - 1], decay, out=carry)
+            out[t] += carry
+        return np.moveaxis(out, 0, axis)
+    block = max(T, 1) if decay >= 1 else max(1, int(np.log(FLIP_BLOCK_SCALE) / -np.log(decay)))
+    grow = decay ** np.arange(min(block, T), dtype=np.float64)
+    grow = grow.reshape((-1,) + (1,) * (m.ndim - 1))
+    for lo in range(0, T, block):
+        f = out[lo:lo + block]
+        g = grow[:len(f)]
+        f *= 1 / g
+        if lo:
+            # carry the previous block's last value in through the first term
+            f[0] += decay / (1 - decay) * out[lo - 1]
+        np.cumsum(f, axis=0, out=f)
+        f *= (1 - decay) * g
+    return np.moveaxis(out, 0, axis)
+
+
+def autocorrelation(x, max_lag=MAX_LAG, axis=0):
+    # normalized autocorrelation at lags 0..max_lag (lag first), by FFT; nan for constant series
+    x = np.moveaxis(np.asarray(x, dtype=np.float64), axis, 0)
+    T = len(x)
+    max_lag = min(max_lag, T - 1)
+    x = x - x.mean(axis=0)
+    n = 1 << int(2 * T - 1).bit_length()
+    f = np.fft.rfft(x, n=n, axis=0)
+    acov = np.fft.irfft(f * np.conj(f), n=n, axis=0)[:max_lag + 1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return acov / acov[:1]
+
+
+def autocorrelation_time(acf):
+    # integrated autocorrelation time 1 + 2 * sum of acf up to its first non-positive lag
+    positive = np.cumprod(acf[1:] > 0, axis=0, dtype=bool)
+    return 1.0 + 2.0 * np.where(positive, acf[1:], 0.0).sum(axis=0)
+
+
+def regimes(margin, majority=None, window=WINDOW, axis=0, locked=LOCKED_MARGIN,
+            contested=CONTESTED_MARGIN):
+    # label of every full window of `window` steps, indexes into REGIMES;
+    # without a majority trace, "locked" needs the margin alone
+    margin = np.moveaxis(np.asarray(margin, dtype=np.float64), axis, 0)
+    n = len(margin) // window
+    blocks = margin[:n * window].reshape((n, window) + margin.shape[1:])
+    level = blocks.mean(axis=1)
+    steady = np.ones(level.shape, dtype=bool)
+    if majority is not None:
+        m = np.moveaxis(np.asarray(majority), axis, 0)[:n * window]
+        m = m.reshape((n, window) + m.shape[1:])
+        steady = (m == m[:, :1]).all(axis=1)
+    labels = np.full(level.shape, REGIMES.index("drifting"), dtype=np.uint8)
+    labels[level < contested] = REGIMES.index("contested")
+    labels[(level >= locked) & steady] = REGIMES.index("locked")
+    return np.moveaxis(labels, 0, axis)
+
+
+def regime_fractions(labels, axis=0):
+    # fraction of windows in each regime, shape (other axes..., len(REGIMES))
+    labels = np.moveaxis(np.asarray(labels), axis, -1)
+    return np.stack([(labels == k).mean(axis=-1) for k in range(len(REGIMES))], axis=-1)
+
+
+def analyze(traj, window=WINDOW, max_lag=MAX_LAG, batch=None):
+    # per-replicate statistics of a Trajectory (or dict of [step, replicate, ctx] arrays)
+    # with "majority" and "margin" columns, computed over batches of replicates:
+    # flip_count, max_run, dwell (per value), margin_tau, regime_fractions, and the
+    # pooled run_lengths[ctx, value, length] of every uncensored majority run
+    majority, margin = traj["majority"], traj["margin"]
+    T, R = majority.shape[:2]
+    per_rep = int(np.prod(majority.shape[2:], dtype=np.int64))
+    if batch is None:
+        # the FFT works on ~2T complex values per series, the dominant cost
+        batch = max(1, BATCH_BYTES // (64 * T * per_rep))
+    out = {}
+    for lo in range(0, R, batch):
+        hi = min(R, lo + batch)
+        m = np.asarray(majority[:, lo:hi])
+        g = np.asarray(margin[:, lo:hi])
+        part = {"flip_count": flip_counts(m), "max_run": max_run(m),
+                "dwell": dwell_times(m, n_values=2),
+                "margin_tau": autocorrelation_time(autocorrelation(g, max_lag)),
+                "regime_fractions": regime_fractions(regimes(g, m, window))}
+        for name, v in part.items():
+            out.setdefault(name, []).append(v)
+        dist = run_length_distribution(m, max_len=T, n_values=2)
+        out["run_lengths"] = out["run_lengths"] + dist if "run_lengths" in out else dist
+    for name, parts in out.items():
+        if name != "run_lengths":
+            out[name] = np.concatenate(parts, axis=0)
+    return out
@@ -0,0 +1,165 @@
+"""
+Scaling benchmarks for the blackboard versions on the shared core.
+
+Times the step loop (engine.simulate: steps plus streamed observables) of
+every version while varying N_AGENTS, BB_SIZE, WINDOW and STEPS one axis at
+a time around the scripts' defaults. Reports steps/sec, agent-updates/sec
+and peak memory, and compares against a stored JSON baseline:
+
+    python blackboard_bench.py --save bench_baseline.json       # record
+    python blackboard_bench.py --baseline bench_baseline.json   # compare, exit 1 on regression
+
+Timing is the best of `repeat` runs after a warm-up (Numba compilation,
+first-touch allocations). Peak memory is the tracemalloc peak of a separate
+short run, since tracing slows the loop and state memory does not grow with
+steps. Headless: output is plain text, nothing is plotted.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import blackboard_engine as engine
+
+VERSIONS = ("v0", "v1", "v2", "v4")
+MODES = ("synchronous", "sequential")
+
+BASE = {"n_agents": engine.N_AGENTS, "bb_size": engine.BB_SIZE, "window": engine.WINDOW,
+        "steps": engine.STEPS}
+
+# values tried for each axis, the other axes staying at BASE
+AXES = {
+    "quick": {"n_agents": [50, 500], "bb_size": [32, 512], "window": [25, 100],
+              "steps": [500]},
+    "full": {"n_agents": [50, 500, 5000, 50000], "bb_size": [32, 512, 8192],
+             "window": [25, 100, 400], "steps": [500, 2000]},
+}
+
+MEMORY_STEPS = 20
+THRESHOLD = 0.2
+
+
+def cases(versions=VERSIONS, modes=MODES, preset="quick"):
+    # one case per (version, mode, axis value); board axes are skipped for v0
+    out, seen = [], set()
+    for rules in versions:
+        for mode in modes:
+            for axis, values in AXES[preset].items():
+                if rules == "v0" and axis in ("bb_size", "window"):
+                    continue
+                for v in values:
+                    case = dict(BASE, rules=rules, mode=mode, **{axis: v})
+                    cid = case_id(case)
+                    if cid not in seen:
+                        seen.add(cid)
+                        out.append(case)
+    return out
+
+
+def case_id(case):
+    return (f"{case['rules']}/{case['mode']}/n{case['n_agents']}/s{case['bb_size']}"
+            f"/w{case['window']}/t{case['steps']}")
+
+
+def _ecology(case, seed=0):
+    sizes = {"n_agents": case["n_agents"]}
+    if case["rules"] != "v0":
+        sizes.update(bb_size=case["bb_size"], window=case["window"])
+    return engine.Ecology(case["rules"], seed=seed, **sizes)
+
+
+def run_case(case, repeat=3):
+    # warm-up: compiles kernels and touches the code paths once
+    engine.simulate(_ecology(case), 2, case["mode"])
+
+    best = float("inf")
+    for r in range(repeat):
+        eco = _ecology(case, seed=r)
+        t0 = time.perf_counter()
+        engine.simulate(eco, case["steps"], case["mode"])
+        best = min(best, time.perf_counter() - t0)
+
+    tracemalloc.start()
+    eco = _ecology(case)
+    engine.simulate(eco, min(MEMORY_STEPS, case["steps"]), case["mode"])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"seconds": best,
+            "steps_per_sec": case["steps"] / best,
+            "agent_updates_per_sec": case["steps"] * case["n_agents"] / best,
+            "peak_mb": peak / 2**20,
+            "kernel": eco.kernel}
+
+
+def machine():
+    return {"python": platform.python_version(), "numpy": np.__version__,
+            "machine": platform.machine(), "processor": platform.processor(),
+            "system": platform.system()}
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    # regressions: slower by more than `threshold`, or peak memory up by more than `threshold`
+    regressions = []
+    for cid, r in results.items():
+        b = baseline.get(cid)
+        if b is None:
+            continue
+        speed = r["steps_per_sec"] / b["steps_per_sec"]
+        memory = r["peak_mb"] / b["peak_mb"] if b["peak_mb"] else 1.0
+        r["speed_vs_baseline"] = speed
+        r["memory_vs_baseline"] = memory
+        if speed < 1 - threshold or memory > 1 + threshold:
+            regressions.append(cid)
+    return regressions
+
+
+def report(results, regressions=()):
+    print(f"{'case':<40} {'steps/s':>10} {'updates/s':>12} {'peak MB':>9} {'vs base':>8}")
+    for cid, r in results.items():
+        vs = f"{r['speed_vs_baseline']:.2f}x" if "speed_vs_baseline" in r else "-"
+        flag = "  REGRESSION" if cid in regressions else ""
+        print(f"{cid:<40} {r['steps_per_sec']:>10.1f} {r['agent_updates_per_sec']:>12.3g} "
+              f"{r['peak_mb']:>9.2f} {vs:>8}{flag}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--preset", choices=sorted(AXES), default="quick")
+    ap.add_argument("--versions", nargs="+", default=list(VERSIONS))
+    ap.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--baseline", help="JSON baseline to compare against")
+    ap.add_argument("--threshold", type=float, default=THRESHOLD,
+                    help="allowed fractional slowdown / memory growth (default 0.2)")
+    ap.add_argument("--save", help="write these results as a baseline JSON")
+    args = ap.parse_args(argv)
+
+    results = {}
+    for case in cases(args.versions, args.modes, args.preset):
+        results[case_id(case)] = run_case(case, args.repeat)
+        print(".", end="", flush=True, file=sys.stderr)
+    print(file=sys.stderr)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.threshold)
+    report(results, regressions)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"machine": machine(), "created": time.time(), "results": results},
+                      f, indent=1)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Bit-packed board storage for the blackboard core (binary behaviors, v1-v4).
+
+Slots are stored 64 per uint64 word, words[replicate, ctx, word], and the
+oldest row of the history window is kept packed too, so a board costs size/8
+bytes instead of one byte (array backend) or one Python int (the old list
+boards); the rest of the window is the shared delta encoding.
+Counts come from popcounts and are kept up to date on every write, so
+majority / margin / entropy stay O(1). Single-slot writes are word-level
+bit set/clear, and decay events go through the same bit writes.
+
+Select it with Ecology(..., backend="packed") or BB_BACKEND = "packed" in the
+minimal_blackboard scripts.
+"""
+
+import numpy as np
+
+from blackboard_engine import Boards
+
+WORD_BITS = 64
+
+
+def popcount(words):
+    # set bits per row of (..., n_words) uint64
+    words = np.ascontiguousarray(words, dtype=np.uint64)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+    return np.unpackbits(words.view(np.uint8), axis=-1).sum(axis=-1, dtype=np.int64)
+
+
+def pack_bits(bits, n_words):
+    # (..., size) bool/0-1 -> (..., n_words) little-endian uint64, padding bits zero
+    bits = np.asarray(bits, dtype=bool)
+    packed = np.packbits(bits, axis=-1, bitorder="little")
+    out = np.zeros(bits.shape[:-1] + (n_words * 8,), dtype=np.uint8)
+    out[..., :packed.shape[-1]] = packed
+    return out.view(np.uint64)
+
+
+def unpack_bits(words, size):
+    words = np.ascontiguousarray(words, dtype=np.uint64)
+    return np.unpackbits(words.view(np.uint8), axis=-1, bitorder="little")[..., :size]
+
+
+class PackedBoards(Boards):
+    """Boards with slots packed 64 per uint64 word: words[replicate, ctx, word]."""
+
+    STATE = ("words",) + Boards.STATE[1:]
+
+    def _init_slots(self, rng):
+        shape = (self.n_reps, self.n_boards)
+        self.n_words = -(-self.size // WORD_BITS)
+        self.words = pack_bits(rng.integers(0, 2, shape + (self.size,)), self.n_words)
+        self.ones = popcount(self.words)
+        self.base = np.zeros_like(self.words)
+
+    def bits(self):
+        return unpack_bits(self.words, self.size)
+
+    def first_slot(self):
+        return (self.words[..., 0] & np.uint64(1)).astype(np.uint8)
+
+    def oldest_first_slot(self):
+        return (self.base[..., 0] & np.uint64(1)).astype(np.uint8)
+
+    def _storage(self):
+        return self.words
+
+    def _unpack(self, store):
+        return unpack_bits(store, self.size)
+
+    def _read(self, store, rep, ctx, idx):
+        bit = np.left_shift(np.uint64(1), (idx & 63).astype(np.uint64))
+        return ((store[rep, ctx, idx >> 6] & bit) != 0).astype(np.uint8)
+
+    def _assign(self, store, rep, ctx, idx, values):
+        # distinct slots may share a word, so accumulate with ufunc.at
+        w = idx >> 6
+        bit = np.left_shift(np.uint64(1), (idx & 63).astype(np.uint64))
+        on = values.astype(bool)
+        off = ~on
+        np.bitwise_or.at(store, (rep[on], ctx[on], w[on]), bit[on])
+        np.bitwise_and.at(store, (rep[off], ctx[off], w[off]), ~bit[off])
+
+    def _toggle(self, store, keys):
+        board, idx = np.divmod(keys, self.size)
+        bit = np.left_shift(np.uint64(1), (idx & 63).astype(np.uint64))
+        np.bitwise_xor.at(store.reshape(-1), board * self.n_words + (idx >> 6), bit)
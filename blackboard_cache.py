@@ -0,0 +1,238 @@
+"""
+Content-addressed, disk-backed cache of finished blackboard runs.
+
+Notebooks and scripts keep rerunning the same simulation. ResultCache
+memoizes engine.run() (the observables, whose FIELD NOTE report() prints)
+and ensemble.run_ensemble() (per-replicate scalars and the ensemble
+summary) under a hash of everything that decides the result:
+
+- the resolved rule set (every rule field after knob overrides, not just its name),
+- the full parameter set (sizes, backend, graph, ...), steps, mode,
+  replicates and seed,
+- the engine version: a hash of the simulation modules' source, so editing
+  the engine invalidates every entry.
+
+Entries live in one SQLite file as pickles, with a size cap and LRU
+eviction. Hit/miss counts are kept per ResultCache and in total in the file.
+Runs without a seed are random by definition and are never cached.
+
+    cache = ResultCache()                                  # ~/.cache/blackboard/results.db
+    obs = cache.run("v4", seed=1, mode="sequential")       # runs, stores, prints the FIELD NOTE
+    obs = cache.run("v4", seed=1, mode="sequential")       # instant
+    per_rep, summary = cache.ensemble("v4", replicates=500, seed=1)
+    cache.stats()
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+import blackboard_engine as engine
+import blackboard_ensemble as ensemble
+from blackboard_rules import get_rules
+
+DEFAULT_PATH = os.environ.get("BLACKBOARD_CACHE", os.path.join(
+    os.path.expanduser("~"), ".cache", "blackboard", "results.db"))
+MAX_BYTES = 1 << 30
+
+# modules whose source decides simulation results
+ENGINE_MODULES = ("blackboard_engine", "blackboard_rules", "blackboard_rng",
+                  "blackboard_kernels", "blackboard_bitpacked", "blackboard_observables",
+                  "blackboard_graphs", "blackboard_convergence", "blackboard_ensemble")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    used REAL NOT NULL,
+    hits INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+_engine_version = None
+
+
+def engine_version():
+    # sha256 over the source of ENGINE_MODULES, computed once per process
+    global _engine_version
+    if _engine_version is None:
+        import importlib
+        h = hashlib.sha256()
+        for name in ENGINE_MODULES:
+            with open(importlib.import_module(name).__file__, "rb") as f:
+                h.update(name.encode() + b"\0" + f.read())
+        _engine_version = h.hexdigest()
+    return _engine_version
+
+
+def _plain(x):
+    # JSON-able form of rule fields and parameters (tuples, namedtuples, arrays, specs)
+    if hasattr(x, "_asdict"):
+        return {k: _plain(v) for k, v in x._asdict().items()}
+    if isinstance(x, dict):
+        return {str(k): _plain(v) for k, v in x.items()}
+    if isinstance(x, (list, tuple, np.ndarray)):
+        return [_plain(v) for v in x]
+    if isinstance(x, np.generic):
+        return x.item()
+    if hasattr(x, "spec"):          # blackboard_graphs.Graph
+        return _plain(x.spec)
+    return x
+
+
+def rules_fingerprint(rules):
+    rules = get_rules(rules)
+    return {name: _plain(getattr(rules, name))
+            for name in ("name", "contexts", "read", "mutate", "coupling", "write", "decay")}
+
+
+def cache_key(kind, rules, **inputs):
+    # hash of the run kind, the resolved rules, every input and the engine version
+    knobs = {k: v for k, v in inputs.get("params", {}).items() if k not in engine.SIZE_KNOBS}
+    blob = json.dumps({"kind": kind,
+                       "rules": rules_fingerprint(get_rules(rules).override(**knobs)),
+                       "inputs": _plain(inputs), "engine": engine_version()},
+                      sort_keys=True, default=repr)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def _observing(observe):
+    # observe is part of the key only when set, like blackboard_sweep.point_config
+    return {} if observe is None else {"observe": observe}
+
+
+class ResultCache:
+    def __init__(self, path=DEFAULT_PATH, max_bytes=MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        # this session's counts; stats() adds the totals kept in the file
+        self.hits = 0
+        self.misses = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # one transaction, committed on success, and the connection closed
+        conn = sqlite3.connect(self.path)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _count(self, conn, name):
+        if name == "hits":
+            self.hits += 1
+        elif name == "misses":
+            self.misses += 1
+        conn.execute("INSERT INTO counters VALUES (?, 1) "
+                     "ON CONFLICT(name) DO UPDATE SET value = value + 1", (name,))
+
+    def get(self, key):
+        # the stored value, or None (a miss)
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._count(conn, "misses")
+                return None
+            conn.execute("UPDATE entries SET used = ?, hits = hits + 1 WHERE key = ?",
+                         (time.time(), key))
+            self._count(conn, "hits")
+        return pickle.loads(row[0])
+
+    def put(self, key, value, kind=""):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, 0)",
+                         (key, kind, blob, len(blob), now, now))
+            self._evict(conn)
+
+    def _evict(self, conn):
+        # least recently used first, until the cache fits in max_bytes
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY used").fetchall():
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._count(conn, "evictions")
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def _memoize(self, kind, compute, key):
+        value = self.get(key) if key is not None else None
+        if value is None:
+            value = compute()
+            if key is not None:
+                self.put(key, value, kind)
+        return value
+
+    def run(self, rules="v4", steps=engine.STEPS, mode="synchronous", seed=None, verbose=True,
+            observe=None, **params):
+        # engine.run(): the observables of one run; prints the FIELD NOTE when verbose
+        # (and all observables were tracked)
+        key = None
+        if seed is not None:
+            key = cache_key("run", rules, steps=steps, mode=mode, seed=seed, params=params,
+                            **_observing(observe))
+        obs = self._memoize("run", lambda: engine.run(rules, steps, mode, seed, verbose=False,
+                                                       observe=observe, **params), key)
+        if verbose and observe is None:
+            engine.report(obs)
+        return obs
+
+    def ensemble(self, rules="v4", replicates=ensemble.REPLICATES, steps=engine.STEPS,
+                 mode="synchronous", seed=None, verbose=True, early_stop=False, observe=None,
+                 **params):
+        # ensemble.run_ensemble(): (per_rep, summary); prints the ensemble FIELD NOTE when verbose
+        key = None
+        if seed is not None and early_stop in (True, False):
+            key = cache_key("ensemble", rules, replicates=replicates, steps=steps, mode=mode,
+                            seed=seed, early_stop=early_stop, params=params,
+                            **_observing(observe))
+        per_rep, summary = self._memoize("ensemble", lambda: ensemble.run_ensemble(
+            rules, replicates, steps, mode, seed, verbose=False, early_stop=early_stop,
+            observe=observe, **params), key)
+        if verbose:
+            contexts = get_rules(rules).override(
+                **{k: v for k, v in params.items() if k not in engine.SIZE_KNOBS}).contexts
+            ensemble.report(summary, replicates, contexts)
+        return per_rep, summary
+
+    def stats(self):
+        with self._connect() as conn:
+            entries, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            totals = dict(conn.execute("SELECT name, value FROM counters"))
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "total_hits": totals.get("hits", 0), "total_misses": totals.get("misses", 0),
+                "evictions": totals.get("evictions", 0),
+                "entries": entries, "bytes": size, "max_bytes": self.max_bytes}
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries")
+            conn.execute("DELETE FROM counters")
+        self.hits = self.misses = 0
@@ -0,0 +1,197 @@
+"""
+Checkpoint / resume for long blackboard runs.
+
+A checkpoint is a directory holding one .npy file per state array (agent
+behaviors and couplings, board slots, history window deltas, running counts,
+last_majority, flip_rate, the per-replicate RNG streams and the observable
+accumulators) plus meta.json for the Ecology config and scalar counters.
+Loading memory-maps the arrays copy-on-write, so the file is never modified
+and many continuations can share one checkpoint's pages.
+
+    ckpt = Checkpointer("runs/v4", every=1000)
+    obs = engine.simulate(eco, 100_000, checkpoint=ckpt)
+
+    eco, obs = load(latest("runs/v4"))               # bit-exact resume
+    engine.simulate(eco, 100_000 - eco.t, obs=obs)
+
+    eco = fork(latest("runs/v4"), replicates=500)    # 500 continuations of replicate 0
+    obs = engine.simulate(eco, 10_000)
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+
+import blackboard_engine as engine
+from blackboard_observables import FINAL
+
+FORMAT = 3
+
+
+def _split(obj, names=None):
+    # ndarray attributes -> arrays, everything else -> JSON-able metadata
+    arrays, meta = {}, {}
+    for name, v in vars(obj).items():
+        if names is not None and name not in names:
+            continue
+        if isinstance(v, np.ndarray):
+            arrays[name] = v
+        elif isinstance(v, np.generic):
+            meta[name] = v.item()
+        else:
+            meta[name] = v
+    return arrays, meta
+
+
+def save(eco, obs, path):
+    # write to a temporary directory, then rename, so a crash never leaves a half checkpoint
+    tmp = path + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    arrays = {"behavior": eco.behavior}
+    if eco.coupling is not None:
+        arrays["coupling"] = eco.coupling
+    arrays.update((f"rng.{k}", v) for k, v in eco.rng.state().items())
+
+    meta = {"format": FORMAT, "t": eco.t, "config": eco.config, "obs": {}}
+    if obs is not None:
+        meta["snapshots"] = []
+    bb = eco.boards
+    if bb is not None:
+        board_arrays, _ = _split(bb, bb.STATE)
+        arrays.update((f"boards.{k}", v) for k, v in board_arrays.items())
+        meta["boards"] = {k: getattr(bb, k) for k in bb.SCALARS}
+
+    for name, acc in (obs or {}).items():
+        if acc is None or not hasattr(acc, "update"):
+            # end-of-run snapshots (flip_rate, min_coupling) are recomputed
+            meta["snapshots"].append(name)
+            continue
+        acc_arrays, acc_meta = _split(acc)
+        arrays.update((f"obs.{name}.{k}", v) for k, v in acc_arrays.items())
+        meta["obs"][name] = acc_meta
+
+    for name, a in arrays.items():
+        np.save(os.path.join(tmp, name + ".npy"), a)
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.rename(tmp, path)
+
+
+def _load_arrays(path, mmap):
+    arrays = {}
+    for fname in os.listdir(path):
+        if fname.endswith(".npy"):
+            a = np.load(os.path.join(path, fname), mmap_mode="c" if mmap else None)
+            arrays[fname[:-4]] = np.asarray(a)
+    return arrays
+
+
+def _build(config, **overrides):
+    config = dict(config, **overrides)
+    knobs = config.pop("knobs")
+    seed = np.random.SeedSequence(config.pop("seed"), spawn_key=config.pop("spawn_key"))
+    return engine.Ecology(seed=seed, **config, **knobs)
+
+
+def load(path, mmap=True):
+    # rebuild the Ecology and observables exactly as they were when saved
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    arrays = _load_arrays(path, mmap)
+
+    eco = _build(meta["config"])
+    eco.t = meta["t"]
+    eco.behavior = arrays["behavior"]
+    if "coupling" in arrays:
+        eco.coupling = arrays["coupling"]
+    eco.rng.set_state({k[4:]: v for k, v in arrays.items() if k.startswith("rng.")})
+    if eco.boards is not None:
+        for name in eco.boards.STATE:
+            setattr(eco.boards, name, arrays[f"boards.{name}"])
+        vars(eco.boards).update(meta["boards"])
+
+    # the observables the run tracked (checkpoints without "snapshots" tracked them all)
+    observe = None
+    if "snapshots" in meta:
+        observe = {name: acc_meta.get("every", 1) for name, acc_meta in meta["obs"].items()}
+        observe.update((name, FINAL) for name in meta["snapshots"])
+    obs = engine.observables(eco, observe)
+    for name, acc_meta in meta["obs"].items():
+        acc = obs[name]
+        vars(acc).update(acc_meta)
+        prefix = f"obs.{name}."
+        vars(acc).update((k[len(prefix):], v) for k, v in arrays.items() if k.startswith(prefix))
+    return eco, obs
+
+
+def fork(path, replicates, rep=0, seed=None, stream=1):
+    # `replicates` continuations of saved replicate `rep`, each on a fresh stream
+    # (seed defaults to the checkpoint's own); observables start empty
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    arrays = _load_arrays(path, mmap=True)
+
+    overrides = {"replicates": replicates, "stream": stream, "first_replicate": 0}
+    if seed is not None:
+        overrides.update(seed=seed, spawn_key=[])
+    eco = _build(meta["config"], **overrides)
+    eco.t = meta["t"]
+
+    def spread(a):
+        return np.repeat(a[rep:rep + 1], replicates, axis=0)
+
+    eco.behavior = spread(arrays["behavior"])
+    if "coupling" in arrays:
+        eco.coupling = spread(arrays["coupling"])
+    bb = eco.boards
+    if bb is not None:
+        vars(bb).update(meta["boards"])
+        for name in bb.STATE:
+            if not name.startswith("delta_"):
+                setattr(bb, name, spread(arrays[f"boards.{name}"]))
+        live = slice(bb.delta_start, bb.delta_end)
+        bb._spread_history(arrays["boards.delta_keys"][live], arrays["boards.delta_len"], rep)
+    return eco
+
+
+def checkpoint_path(root, t):
+    return os.path.join(root, f"step_{t:09d}")
+
+
+def checkpoints(root):
+    # finished checkpoints under `root`, oldest first
+    if not os.path.isdir(root):
+        return []
+    names = sorted(n for n in os.listdir(root) if n.startswith("step_") and not n.endswith(".tmp"))
+    return [os.path.join(root, n) for n in names]
+
+
+def latest(root):
+    found = checkpoints(root)
+    return found[-1] if found else None
+
+
+class Checkpointer:
+    """simulate(..., checkpoint=Checkpointer(root, every)) saves every `every` steps.
+
+    keep=N keeps only the newest N checkpoints under `root`.
+    """
+
+    def __init__(self, root, every, keep=None):
+        self.root = root
+        self.every = every
+        self.keep = keep
+        os.makedirs(root, exist_ok=True)
+
+    def write(self, eco, obs):
+        if eco.t % self.every:
+            return
+        save(eco, obs, checkpoint_path(self.root, eco.t))
+        if self.keep:
+            for old in checkpoints(self.root)[:-self.keep]:
+                shutil.rmtree(old)
@@ -0,0 +1,168 @@
+"""
+Convergence detection and early stopping for blackboard runs.
+
+Two detectors, both per replicate:
+
+- absorbing: the discrete state can never change again. Every context has
+  all agents on one behavior v, every board slot and the whole history
+  window at v, and no noise source left (mutate_prob and erase_prob are 0
+  for that context). For neighbor reads (v0) consensus alone is absorbing,
+  unless a graph has isolated agents (they take a coin on every read).
+  Couplings and flip_rate then only relax deterministically toward 1 / 0.
+  This check is exact.
+- steady: the block means of the monitored series (margin, avg_coupling,
+  flip_rate; ent_agents for v0) over two consecutive blocks of `window`
+  steps differ by less than `tol`, for `patience` blocks in a row.
+
+    monitor = ConvergenceMonitor(window=100, tol=0.05)
+    obs = engine.simulate(eco, 100_000, monitor=monitor)   # stops once `quorum` of replicates converged
+    monitor.converged_at, monitor.reason                  # per replicate, -1 / "" if not
+    monitor.extrapolate(obs, 100_000)                     # fill the skipped steps
+"""
+
+import numpy as np
+
+SERIES = ("margin", "avg_coupling", "flip_rate")
+WINDOW = 100
+TOL = 0.05
+PATIENCE = 2
+
+
+class ConvergenceMonitor:
+    def __init__(self, window=WINDOW, tol=TOL, patience=PATIENCE, series=SERIES,
+                 absorbing=True, steady=True, stop=True, min_steps=0, quorum=1.0):
+        self.window = window
+        self.tol = tol
+        self.patience = patience
+        self.series = series
+        self.absorbing = absorbing
+        self.steady = steady
+        self.stop = stop
+        self.min_steps = min_steps
+        # fraction of replicates that must have converged before stopping
+        self.quorum = quorum
+
+        self.converged_at = None
+        self.reason = None
+        self.t = None           # steps taken when last updated
+        self._sums = {}
+        self._prev = {}
+        self._block_means = {}
+        self._calm = None
+        self._block_len = 0
+        self._noiseless = None
+
+    @property
+    def observables(self):
+        # the values update() reads; simulate() computes them every step, sampled or not
+        # (flip_rate comes from the boards)
+        return ("ent_agents",) + tuple(name for name in self.series if name != "flip_rate")
+
+    def _setup(self, eco):
+        R = eco.replicates
+        self.converged_at = np.full(R, -1, dtype=np.int64)
+        self.reason = np.full(R, "", dtype=object)
+        self._calm = np.zeros(R, dtype=np.int64)
+
+        # contexts in which nothing random can disturb a uniform state
+        rules = eco.rules
+        C = rules.n_contexts
+        noiseless = np.ones(C, dtype=bool)
+        if rules.mutate is not None:
+            noiseless &= np.asarray(rules.mutate.prob) == 0
+        if rules.decay is not None:
+            noiseless &= np.asarray(rules.decay.erase_prob) == 0
+        if eco.graph is not None and (eco.graph.degree == 0).any():
+            noiseless[:] = False
+        self._noiseless = bool(noiseless.all())
+
+    def _absorbed(self, eco, values):
+        # cheap prefilter: agent entropy 0 <=> every context is in consensus
+        consensus = (values["ent_agents"] == 0).all(axis=-1)
+        if not self._noiseless or not consensus.any():
+            return np.zeros_like(consensus)
+        bb = eco.boards
+        if bb is None:
+            return consensus
+        v = eco.behavior[..., 0].astype(np.int64)                        # (R, C)
+        board = bb.ones == v * bb.size
+        history = bb.window_ones == v * bb.hist_len * bb.size
+        return consensus & (board & history).all(axis=-1)
+
+    def _series_values(self, eco, values):
+        out = {name: values[name] for name in self.series if name in values}
+        if "flip_rate" in self.series and eco.boards is not None:
+            out["flip_rate"] = eco.boards.flip_rate
+        if not out:
+            out["ent_agents"] = values["ent_agents"]
+        return out
+
+    def update(self, eco, values):
+        # feed one step; returns True when the run should stop
+        if self.converged_at is None:
+            self._setup(eco)
+        t = self.t = eco.t
+        open_ = self.converged_at < 0
+
+        if self.absorbing and open_.any():
+            hit = open_ & self._absorbed(eco, values)
+            self.converged_at[hit] = t
+            self.reason[hit] = "absorbing"
+
+        # block means of every observable: steady-state test and extrapolation
+        self._block_len += 1
+        tracked = dict(values)
+        tracked.update(self._series_values(eco, values))
+        for name, x in tracked.items():
+            x = np.asarray(x, dtype=np.float64)
+            self._sums[name] = self._sums.get(name, 0.0) + x
+        if self._block_len == self.window:
+            means = {name: s / self.window for name, s in self._sums.items()}
+            if self.steady and self._prev:
+                calm = np.ones(eco.replicates, dtype=bool)
+                for name in self._series_values(eco, values):
+                    diff = np.abs(means[name] - self._prev[name])
+                    calm &= (diff < self.tol).reshape(eco.replicates, -1).all(axis=-1)
+                self._calm = np.where(calm, self._calm + 1, 0)
+                hit = (self.converged_at < 0) & (self._calm >= self.patience)
+                self.converged_at[hit] = t
+                self.reason[hit] = "steady"
+            self._prev = means
+            self._block_means = means
+            self._sums = {}
+            self._block_len = 0
+
+        done = (self.converged_at >= 0).mean() >= self.quorum
+        return bool(self.stop and t >= self.min_steps and done)
+
+    @property
+    def n_converged(self):
+        return 0 if self.converged_at is None else int((self.converged_at >= 0).sum())
+
+    def extrapolate(self, obs, steps):
+        # extend stopped accumulators to `steps` steps, assuming the state persists:
+        # absorbed replicates keep their last value, the rest their last block mean.
+        # Only means (and majority runs) are extended; min/max/var cover the steps run.
+        # Accumulators sampled every k steps get the samples they would have taken.
+        from blackboard_observables import FINAL, RunningStats, RunTracker
+        absorbed = self.reason == "absorbing"
+        if self.t is None or steps <= self.t:
+            return obs
+        for name, acc in obs.items():
+            if not isinstance(acc, (RunningStats, RunTracker)) or acc.every == FINAL:
+                continue
+            # the skipped steps self.t .. steps - 1 that are multiples of `every`
+            missing = len(range(-(-self.t // acc.every) * acc.every, steps, acc.every))
+            if isinstance(acc, RunningStats):
+                level = self._block_means.get(name, acc.last)
+                level = np.where(absorbed.reshape((-1,) + (1,) * (np.ndim(acc.last) - 1)),
+                                 acc.last, level)
+                acc.total = acc.total + missing * level
+                acc.n += missing
+                acc._extrapolated += missing
+            elif acc.current is not None:
+                # an absorbed majority never flips again, its run just continues
+                grow = absorbed.reshape((-1,) + (1,) * (np.ndim(acc.current) - 1))
+                acc.current = np.where(grow, acc.current + missing, acc.current)
+                acc.best = np.maximum(acc.best, acc.current)
+        return obs
@@ -0,0 +1,265 @@
+"""
+Domain decomposition: one large synchronous run split across worker processes.
+
+The agent population is cut into fixed chunks of `chunk` agents and every
+worker process owns a contiguous run of chunks. Agent state (behavior,
+coupling) and the boards (slots, counts, history window, flip rate) live in
+shared memory, so no state is copied between processes; a step costs a few
+bytes of control messages per worker plus the slot writes.
+
+Protocol for one step (the coordinator is the process holding the
+DomainEcology):
+
+1. coordinator -> every worker, over its Pipe: ("step", hist_len, hist_pos).
+2. worker: for each of its chunks, in order, runs the synchronous agent
+   update (contexts, read, mutate, coupling) against the boards as they
+   stood at the start of the step. The boards are only read; a chunk writes
+   only its own agents' columns of behavior / coupling. Slot writes are
+   appended, in agent order, to the worker's shared write buffer
+   (rep, ctx, slot, value rows) and the worker replies with their count.
+3. coordinator: once every worker replied, merges the buffers in chunk
+   order with one Boards.write. A slot written by several agents keeps the
+   highest agent index, the same rule as the single-process synchronous
+   step. Then it runs Boards.step (decay, history, flip rate) in place.
+
+The replies are the barrier: workers never read the boards while the
+coordinator writes them and only the coordinator writes them, so there are
+no locks. Every chunk draws from its own stream (seed, stream, chunk), so a
+run does not depend on the number of workers. It is a different (equally
+valid) trajectory than Ecology with the same seed, whose single stream
+covers all agents.
+
+    with DomainEcology("v4", n_agents=10_000_000, workers=8, seed=1) as eco:
+        obs = engine.simulate(eco, 1000)
+
+Step temporaries are bounded by the chunk size, so with precision="fixed"
+the resident memory is about 6 bytes per agent and replicate for v4
+(engine.memory).
+
+Synchronous mode, board rule sets (v1-v4) and array boards only: sequential
+mode is ordered across the whole population, and v0 polls other agents,
+which would need a snapshot of every domain each step.
+"""
+
+import multiprocessing as mp
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import blackboard_engine as engine
+from blackboard_rng import ReplicateStreams, stream_id
+from blackboard_rules import get_rules
+
+CHUNK = 1 << 16
+
+# board arrays the workers read; the history deltas stay with the coordinator
+SHARED_BOARDS = ("slots", "ones", "base", "window_ones", "flip_rate")
+
+
+def chunk_stream(stream, k):
+    # stream of chunk k; independent of how chunks are dealt to workers
+    return stream_id("domain", stream, k)
+
+
+def _share(a, blocks):
+    # copy `a` into a new shared memory block; returns the view and how to attach to it
+    shm = shared_memory.SharedMemory(create=True, size=max(a.nbytes, 1))
+    blocks.append(shm)
+    out = np.ndarray(a.shape, a.dtype, buffer=shm.buf)
+    out[...] = a
+    return out, (shm.name, a.shape, a.dtype.str)
+
+
+def _attach(spec, blocks):
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    blocks.append(shm)
+    return np.ndarray(shape, dtype, buffer=shm.buf)
+
+
+class _BoardView(engine.Boards):
+    # a worker's view of the shared boards: queries read shared memory,
+    # writes are queued for the coordinator
+    def __init__(self, arrays, size, window):
+        vars(self).update(arrays)
+        self.size = size
+        self.window = window
+        self.hist_len = 0
+        self.hist_pos = 0
+        self.queued = []
+
+    def write(self, rep, ctx, idx, values, unique=False):
+        self.queued.append((rep, ctx, idx, values))
+
+
+def _worker(conn, spec):
+    # the mappings go away with the process; the coordinator unlinks the blocks
+    blocks = []
+    try:
+        config = spec["config"]
+        boards = _BoardView({name: _attach(s, blocks) for name, s in spec["boards"].items()},
+                            config["bb_size"], config["window"])
+        behavior = _attach(spec["behavior"], blocks)
+        coupling = _attach(spec["coupling"], blocks) if spec["coupling"] else None
+        out = _attach(spec["writes"], blocks)
+
+        seed = np.random.SeedSequence(config["seed"], spawn_key=config["spawn_key"])
+        ecos = []
+        for k, lo, hi in spec["chunks"]:
+            # a chunk-sized Ecology on the chunk's stream; its own tiny boards
+            # are swapped for the shared view, its state for shared columns
+            eco = engine.Ecology(spec["rules"], n_agents=hi - lo, bb_size=1, window=1,
+                                 replicates=config["replicates"], kernel="python", seed=seed,
+                                 stream=chunk_stream(config["stream"], k),
+                                 precision=config["precision"])
+            behavior[..., lo:hi] = eco.behavior
+            eco.behavior = behavior[..., lo:hi]
+            if coupling is not None:
+                eco.coupling = coupling[..., lo:hi]
+            eco.boards = boards
+            ecos.append(eco)
+        conn.send("ready")
+
+        while True:
+            msg = conn.recv()
+            if msg[0] == "stop":
+                break
+            _, boards.hist_len, boards.hist_pos = msg
+            boards.queued = []
+            for eco in ecos:
+                eco._step_synchronous()
+            n = 0
+            for rows in boards.queued:
+                m = len(rows[0])
+                out[:, n:n + m] = rows
+                n += m
+            conn.send(n)
+    except Exception as e:
+        conn.send(e)
+
+
+class DomainEcology:
+    """A synchronous Ecology whose agents are split across worker processes.
+
+    Looks like engine.Ecology to simulate(), observables and the convergence
+    monitor: behavior, coupling and boards are the full shared arrays and
+    can be read between steps. Call close() (or use it as a context manager)
+    to stop the workers and free the shared memory.
+    """
+
+    def __init__(self, rules="v4", n_agents=engine.N_AGENTS, bb_size=engine.BB_SIZE,
+                 window=engine.WINDOW, replicates=1, workers=None, chunk=CHUNK, seed=None,
+                 stream=0, precision="double", **knobs):
+        rules = get_rules(rules)
+        if knobs:
+            rules = rules.override(**knobs)
+        if not rules.has_board or rules.read.source == "neighbors":
+            raise ValueError(f"rule set {rules.name!r}: domain decomposition needs a board "
+                             "rule set (v1-v4)")
+        self.rules = rules
+        self.rng = ReplicateStreams(replicates, seed, stream)
+        self.n_agents = n_agents
+        self.replicates = replicates
+        self.t = 0
+        self.graph = None
+        self.profiler = None
+        self.kernel = "python"
+        if precision not in engine.PRECISIONS:
+            raise ValueError(f"unknown precision {precision!r}, "
+                             f"expected one of {sorted(engine.PRECISIONS)}")
+        self.precision = precision
+        self.coupling_scale = float(engine.COUPLING_SCALE) if precision == "fixed" else 1.0
+
+        root = self.rng.root
+        self.config = dict(rules=rules.name, n_agents=n_agents, bb_size=bb_size, window=window,
+                           replicates=replicates, chunk=chunk, seed=root.entropy,
+                           spawn_key=list(root.spawn_key), stream=stream, precision=precision,
+                           knobs={k: np.asarray(v).tolist() if np.ndim(v) else v
+                                  for k, v in knobs.items()})
+
+        # shared state: the boards (built here, from the coordinator's stream) and the agents
+        self._blocks = []
+        C = rules.n_contexts
+        erase = rules.decay.erase_prob if rules.decay else (0.0,) * C
+        self.boards = engine.Boards(replicates, C, bb_size, erase, window, self.rng)
+        board_specs = {}
+        for name in SHARED_BOARDS:
+            shared, board_specs[name] = _share(getattr(self.boards, name), self._blocks)
+            setattr(self.boards, name, shared)
+        self.behavior, behavior_spec = _share(
+            np.zeros((replicates, C, n_agents), dtype=np.uint8), self._blocks)
+        self.coupling, coupling_spec = None, None
+        if rules.coupling is not None:
+            n_couplings = 1 if rules.coupling.shared else C
+            self.coupling, coupling_spec = _share(
+                np.full((replicates, n_couplings, n_agents), self.coupling_scale,
+                        dtype=engine.PRECISIONS[precision]), self._blocks)
+
+        # deal contiguous runs of chunks to the workers
+        chunks = [(k, lo, min(lo + chunk, n_agents)) for k, lo in enumerate(range(0, n_agents, chunk))]
+        workers = max(1, min(workers or os.cpu_count() or 1, len(chunks)))
+        self._conns, self._procs, self._writes = [], [], []
+        for part in np.array_split(np.arange(len(chunks)), workers):
+            owned = [chunks[k] for k in part]
+            n_owned = sum(hi - lo for _, lo, hi in owned)
+            # at most one write per agent and replicate per step
+            writes, writes_spec = _share(np.zeros((4, replicates * n_owned), dtype=np.int64),
+                                         self._blocks)
+            spec = {"config": self.config, "rules": rules, "chunks": owned, "boards": board_specs,
+                    "behavior": behavior_spec, "coupling": coupling_spec, "writes": writes_spec}
+            conn, child = mp.Pipe()
+            proc = mp.Process(target=_worker, args=(child, spec), daemon=True)
+            proc.start()
+            self._conns.append(conn)
+            self._procs.append(proc)
+            self._writes.append(writes)
+        self._gather()
+        self.workers = workers
+
+    def _gather(self):
+        # one reply per worker; a worker exception is re-raised here
+        replies = [conn.recv() for conn in self._conns]
+        for reply in replies:
+            if isinstance(reply, Exception):
+                self.close()
+                raise RuntimeError("domain worker failed") from reply
+        return replies
+
+    def step(self, mode="synchronous"):
+        if mode != "synchronous":
+            raise ValueError(f"DomainEcology runs synchronous steps only, got mode {mode!r}")
+        bb = self.boards
+        for conn in self._conns:
+            conn.send(("step", bb.hist_len, bb.hist_pos))
+        counts = self._gather()
+
+        # merge in chunk order: later agents win slot collisions
+        writes = np.concatenate([w[:, :n] for w, n in zip(self._writes, counts)], axis=1)
+        if writes.shape[1]:
+            bb.write(writes[0], writes[1], writes[2], writes[3].astype(np.uint8))
+        bb.step(self.rng)
+        self.t += 1
+
+    def close(self):
+        for conn, proc in zip(self._conns, self._procs):
+            try:
+                conn.send(("stop",))
+            except OSError:
+                pass  # already gone (it failed)
+            proc.join()
+            conn.close()
+        self._conns, self._procs = [], []
+        # drop every view of the shared blocks before releasing them
+        self.boards = self.behavior = self.coupling = None
+        self._writes = []
+        for shm in self._blocks:
+            shm.close()
+            shm.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
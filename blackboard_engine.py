@@ -0,0 +1,897 @@
+"""
+Shared simulation core for the minimal blackboard models (v0-v4).
+
+Each version is a rule set registered in blackboard_rules; every rule set
+runs on the same NumPy state and observables pipeline here. Agent state is
+indexed [replicate, ctx, agent]; the boards share one slot array
+[replicate, ctx, slot] with a delta-encoded history window and running
+symbol counts. A single run is just replicates=1; see blackboard_ensemble for R > 1.
+minimal_blackboard_v0..v4 are thin entry points over this module.
+
+Modes:
+- "synchronous": every agent reads the boards (and, for v0, the other
+  agents) as they stood at the start of the step and all writes land
+  together. Fast, approximate.
+- "sequential": agents update one at a time in index order, so later agents
+  see what earlier agents just wrote (the original script semantics). Exact;
+  runs the compiled loop from blackboard_kernels when Numba is installed,
+  otherwise loops over agents in Python, vectorized across replicates.
+
+Nothing is specific to two contexts: per-context parameters are arrays
+indexed by ctx and context visits are drawn for all agents at once, so an
+ecology with override(contexts=128) runs the same vectorized step.
+
+Board storage backends: "array" (one uint8 per slot) and "packed"
+(64 slots per uint64 word, see blackboard_bitpacked).
+
+Coupling precision: "double" (float64), "single" (float32) or "fixed"
+(uint16 fixed point in steps of 1/COUPLING_SCALE, which holds the 0.01 /
+0.05 / 0.10 / 0.20 rule steps exactly). Behaviors are always uint8, so a
+fixed-point v4 agent costs 6 bytes per replicate instead of 18. The update
+itself runs in float64 whatever the storage; memory(eco) accounts for every
+state array.
+
+Randomness comes from blackboard_rng: one Philox stream per replicate,
+served in pre-generated blocks. Every draw is shaped replicate-first and
+its size never depends on the state, so replicate r follows the same
+trajectory however the replicates are batched or split across processes.
+Board decay is event-driven: the gaps between erased slots are drawn from a
+geometric distribution on a per-replicate side stream, so a step only
+touches the slots that actually decay.
+"""
+
+import numpy as np
+
+from blackboard_observables import FINAL, OBSERVABLES, RunTracker, applies, register, sampling
+from blackboard_rng import ReplicateStreams, block_generator
+from blackboard_rules import get_rules
+
+N_AGENTS = 50
+STEPS = 500
+
+BB_SIZE = 32
+WINDOW = 25
+
+FLIP_DECAY = 0.9
+
+# initial length of the history delta buffers (grown on demand)
+DELTA_CAPACITY = 1 << 10
+
+# event-driven decay: erase events are generated for blocks of steps covering
+# about this many slot-steps per replicate (at most DECAY_BLOCK_STEPS steps)
+DECAY_BLOCK_SLOTS = 1 << 16
+DECAY_BLOCK_STEPS = 256
+DECAY_STREAM = 1
+
+# coupling storage per precision; fixed point stores round(coupling * COUPLING_SCALE)
+PRECISIONS = {"double": np.float64, "single": np.float32, "fixed": np.uint16}
+COUPLING_SCALE = 10000
+
+MODES = ("synchronous", "sequential")
+
+# Ecology() arguments that are not rule-set knobs (sweeps and caches split params on these)
+SIZE_KNOBS = ("n_agents", "bb_size", "window", "replicates", "backend", "kernel", "stream",
+              "first_replicate", "graph", "profile", "precision")
+BACKENDS = ("array", "packed")
+KERNELS = ("auto", "python", "numba")
+
+
+def binary_entropy(ones, total):
+    # entropy_from_bits() for a 0/1 population, from its count of ones
+    ones = np.asarray(ones, dtype=np.float64)
+    p1 = ones / total
+    p0 = 1.0 - p1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        h = -(np.where(p0 > 0, p0 * np.log2(p0), 0.0)
+              + np.where(p1 > 0, p1 * np.log2(p1), 0.0))
+    return h
+
+
+def max_run(xs, axis=0):
+    # longest run of equal consecutive values along `axis` (batched over the rest)
+    xs = np.moveaxis(np.asarray(xs), axis, 0)
+    if xs.shape[0] == 0:
+        return np.zeros(xs.shape[1:], dtype=np.int64)
+    t = np.arange(xs.shape[0]).reshape((-1,) + (1,) * (xs.ndim - 1))
+    new_run = np.concatenate([np.ones_like(xs[:1], dtype=bool), xs[1:] != xs[:-1]])
+    run_start = np.maximum.accumulate(np.where(new_run, t, 0), axis=0)
+    return (t - run_start + 1).max(axis=0)
+
+
+def sample_distinct(rng, n, k, shape):
+    # k distinct indices from range(n) for every entry of `shape` (Floyd's algorithm)
+    out = np.empty(tuple(shape) + (k,), dtype=np.intp)
+    for m, j in enumerate(range(n - k, n)):
+        t = rng.integers(0, j + 1, shape)
+        if m:
+            t = np.where((out[..., :m] == t[..., None]).any(axis=-1), j, t)
+        out[..., m] = t
+    return out
+
+
+def last_writes(rep, ctx, idx, values, n_boards, size):
+    # keep only the last write to each (rep, ctx, slot), like sequential agents would
+    key = (rep * n_boards + ctx) * size + idx
+    if key.size < 2:
+        return rep, ctx, idx, values
+    _, first_in_reversed = np.unique(key[::-1], return_index=True)
+    sel = key.size - 1 - first_in_reversed
+    return rep[sel], ctx[sel], idx[sel], values[sel]
+
+
+class Boards:
+    """All blackboards of an ecology: slots[replicate, ctx, slot] as uint8."""
+
+    # per-replicate state arrays and scalar counters, saved and restored by blackboard_checkpoint
+    STATE = ("slots", "ones", "base", "delta_keys", "delta_len", "row_ones", "window_ones",
+             "last_majority", "flip_rate")
+    SCALARS = ("hist_len", "hist_pos", "t", "delta_start", "delta_end")
+
+    def __init__(self, n_reps, n_boards, size, erase_prob, window, rng):
+        self.n_reps = n_reps
+        self.n_boards = n_boards
+        self.size = size
+        self.window = window
+        self.erase_prob = np.asarray(erase_prob, dtype=np.float64)
+        self._init_slots(rng)
+
+        # decay runs on its own counter-based side stream, one key per replicate;
+        # events depend only on (key, step), so `t` is all the state there is
+        self.t = 0
+        self.decay_keys = rng.side_keys(DECAY_STREAM, 1)[:, 0]
+        self.decay_block = int(np.clip(DECAY_BLOCK_SLOTS // (n_boards * size), 1, DECAY_BLOCK_STEPS))
+        self._events = None
+
+        # row_ones[..., r] = ones in history row r; window_ones = sum over the window
+        self.row_ones = np.zeros((n_reps, n_boards, window), dtype=np.int64)
+        self.window_ones = np.zeros((n_reps, n_boards), dtype=np.int64)
+        self.hist_len = 0
+        self.hist_pos = 0
+
+        # The window is stored as deltas: `base` is the oldest row, and row r
+        # is the row before it with delta_len[r] slots flipped, given as flat
+        # keys (rep, ctx, slot) in delta_keys[delta_start:delta_end], oldest
+        # row first. Memory follows the slots that change, not window x size.
+        # Writes that change a slot log its key in _flips until the next row
+        # is recorded; a slot flipped twice in a step appears twice and
+        # cancels out, since rows are replayed with XOR.
+        key_dtype = np.int32 if n_reps * n_boards * size < 2**31 else np.int64
+        self.delta_keys = np.zeros(DELTA_CAPACITY, dtype=key_dtype)
+        self.delta_len = np.zeros(window, dtype=np.int64)
+        self.delta_start = 0
+        self.delta_end = 0
+        self._flips = []
+
+        # instability tracking; -1 means "no majority seen yet"
+        self.last_majority = np.full((n_reps, n_boards), -1, dtype=np.int8)
+        self.flip_rate = np.zeros((n_reps, n_boards), dtype=np.float64)
+
+        # blackboard_profile.PhaseProfiler shared with the Ecology, or None
+        self.profiler = None
+
+    # -- storage (PackedBoards overrides these) --
+
+    def _init_slots(self, rng):
+        shape = (self.n_reps, self.n_boards, self.size)
+        self.slots = rng.integers(0, 2, shape, dtype=np.uint8)
+        self.ones = self.slots.sum(axis=-1, dtype=np.int64)
+        self.base = np.zeros_like(self.slots)
+
+    def bits(self):
+        return self.slots
+
+    def first_slot(self):
+        return self.slots[..., 0]
+
+    def oldest_first_slot(self):
+        return self.base[..., 0]
+
+    def _storage(self):
+        return self.slots
+
+    def _read(self, store, rep, ctx, idx):
+        return store[rep, ctx, idx]
+
+    def _assign(self, store, rep, ctx, idx, values):
+        # distinct (rep, ctx, idx)
+        store[rep, ctx, idx] = values
+
+    def _toggle(self, store, keys):
+        # flip the slots at flat keys; repeats allowed (a slot toggled twice is unchanged)
+        np.bitwise_xor.at(store.reshape(-1), keys, np.uint8(1))
+
+    def write(self, rep, ctx, idx, values, unique=False):
+        # unique=True promises no (rep, ctx, idx) repeats, e.g. one agent per replicate
+        if not unique:
+            rep, ctx, idx, values = last_writes(rep, ctx, idx, values, self.n_boards, self.size)
+        self._store(rep, ctx, idx, values, unique)
+
+    def _store(self, rep, ctx, idx, values, unique):
+        # distinct (rep, ctx, idx) from here on
+        store = self._storage()
+        old = self._read(store, rep, ctx, idx)
+        flip = old != values
+        self._flips.append(((rep * self.n_boards + ctx) * self.size + idx)[flip])
+        self._assign(store, rep, ctx, idx, values)
+        self._count_writes(rep, ctx, values, old, unique)
+
+    def _count_writes(self, rep, ctx, new, old, unique):
+        delta = new.astype(np.int64) - old
+        if unique:
+            self.ones[rep, ctx] += delta
+        else:
+            flat = np.bincount(rep * self.n_boards + ctx, weights=delta,
+                               minlength=self.ones.size)
+            self.ones += flat.astype(np.int64).reshape(self.ones.shape)
+
+    def _decay_events(self, block):
+        # Erase events of every board for steps [block*K, block*K + K). Each
+        # slot is erased w.p. p per step, i.e. a Bernoulli process over the
+        # flattened (step, slot) sequence, so the gaps between events are
+        # Geometric(p) and only the erased slots cost anything. Every event
+        # gets a fresh fair bit.
+        K, S = self.decay_block, self.size
+        span = K * S
+        parts = []
+        for r in range(self.n_reps):
+            g = block_generator(self.decay_keys[r], block)
+            for c, p in enumerate(self.erase_prob):
+                if p <= 0:
+                    continue
+                m = int(span * p + 6 * np.sqrt(span * p) + 16)
+                pos = np.cumsum(g.geometric(p, m)) - 1
+                while pos[-1] < span:
+                    pos = np.concatenate([pos, pos[-1] + np.cumsum(g.geometric(p, m))])
+                pos = pos[pos < span]
+                bits = (g.random(len(pos)) < 0.5).astype(np.uint8)
+                parts.append((np.full(len(pos), r), np.full(len(pos), c), pos, bits))
+        if not parts:
+            empty = np.zeros(0, dtype=np.intp)
+            return block, empty, empty, empty, empty.astype(np.uint8), np.zeros(K + 1, np.intp)
+        rep, ctx, pos, bits = (np.concatenate(x) for x in zip(*parts))
+        step, slot = np.divmod(pos, S)
+        order = np.argsort(step, kind="stable")
+        bounds = np.searchsorted(step[order], np.arange(K + 1))
+        return block, rep[order], ctx[order], slot[order], bits[order], bounds
+
+    def _decay(self, rng):
+        # touch only the slots erased this step (see _decay_events)
+        block, k = divmod(self.t, self.decay_block)
+        if self._events is None or self._events[0] != block:
+            self._events = self._decay_events(block)
+        _, rep, ctx, slot, bits, bounds = self._events
+        lo, hi = bounds[k], bounds[k + 1]
+        if hi > lo:
+            self._store(rep[lo:hi], ctx[lo:hi], slot[lo:hi], bits[lo:hi], unique=False)
+
+    # -- delta-encoded history --
+
+    def _record(self, r):
+        # row r := the board now; the base moves on when the oldest row is evicted
+        flips = np.concatenate(self._flips) if self._flips else np.zeros(0, dtype=np.int64)
+        self._flips = []
+        if self.hist_len == 0 or self.window == 1:
+            self.base[...] = self._storage()
+            self.delta_start = self.delta_end = 0
+            return
+        if self.hist_len == self.window:
+            nxt = (r + 1) % self.window
+            lo, hi = self.delta_start, self.delta_start + int(self.delta_len[nxt])
+            self._toggle(self.base, self.delta_keys[lo:hi])
+            self.delta_start = hi
+            self.delta_len[nxt] = 0
+        self._push_delta(r, flips)
+
+    def _push_delta(self, r, keys):
+        m = len(keys)
+        live = self.delta_end - self.delta_start
+        if self.delta_end + m > len(self.delta_keys):
+            # compact to the front, growing the buffer when that is not enough
+            old = self.delta_keys
+            new = np.zeros(max(2 * len(old), live + m), dtype=old.dtype) if live + m > len(old) else old
+            new[:live] = old[self.delta_start:self.delta_end]
+            self.delta_keys = new
+            self.delta_start, self.delta_end = 0, live
+        self.delta_keys[self.delta_end:self.delta_end + m] = keys
+        self.delta_end += m
+        self.delta_len[r] = m
+
+    def _spread_history(self, keys, lens, rep):
+        # the window deltas of replicate `rep` of a saved board (keys already
+        # cut to [delta_start:delta_end]), copied to every replicate here
+        per = self.n_boards * self.size
+        oldest = self.hist_pos if self.hist_len == self.window else 0
+        rows = [(oldest + k) % self.window for k in range(1, self.hist_len)]
+        row = np.repeat(np.arange(len(rows)), lens[rows])
+        mine = keys // per == rep
+        local, row = keys[mine] % per, row[mine]
+        order = np.argsort(np.tile(row, self.n_reps), kind="stable")
+        spread = (np.arange(self.n_reps)[:, None] * per + local).reshape(-1)
+        self.delta_keys = spread[order].astype(self.delta_keys.dtype)
+        self.delta_len = np.zeros(self.window, dtype=np.int64)
+        self.delta_len[rows] = np.bincount(row, minlength=len(rows)) * self.n_reps
+        self.delta_start, self.delta_end = 0, len(self.delta_keys)
+
+    def row_bits(self, age=0):
+        # the recorded board `age` rows after the oldest one in the window, (R, C, size) uint8
+        if not 0 <= age < self.hist_len:
+            raise IndexError(f"row {age} outside a window of {self.hist_len}")
+        out = np.array(self._unpack(self.base))
+        oldest = self.hist_pos if self.hist_len == self.window else 0
+        lo = self.delta_start
+        hi = lo + int(sum(self.delta_len[(oldest + k) % self.window] for k in range(1, age + 1)))
+        np.bitwise_xor.at(out.reshape(-1), self.delta_keys[lo:hi], np.uint8(1))
+        return out
+
+    def _unpack(self, store):
+        return store
+
+    def nbytes(self):
+        live = slice(self.delta_start, self.delta_end)
+        return self._storage().nbytes + self.base.nbytes + self.delta_keys[live].nbytes
+
+    # -- queries --
+
+    def instant_majority(self):
+        # Counter.most_common breaks ties by first occurrence -> slot 0
+        twice = 2 * self.ones
+        return np.where(twice > self.size, 1,
+                        np.where(twice < self.size, 0, self.first_slot())).astype(np.uint8)
+
+    def majority(self):
+        # Temporal majority over the history window; ties go to the first bit
+        # of the oldest snapshot, exactly like the flattened Counter in the scripts.
+        if self.hist_len == 0:
+            return self.instant_majority()
+        total = self.hist_len * self.size
+        twice = 2 * self.window_ones
+        return np.where(twice > total, 1,
+                        np.where(twice < total, 0, self.oldest_first_slot())).astype(np.uint8)
+
+    def majority_margin(self):
+        return np.abs(self.size - 2 * self.ones) / self.size
+
+    def entropy(self):
+        return binary_entropy(self.ones, self.size)
+
+    def step(self, rng):
+        prof = self.profiler
+
+        # decay / perturbation
+        self._decay(rng)
+        if prof:
+            prof.lap("decay")
+
+        # record history after decay, evicting the oldest row when full
+        r = self.hist_pos
+        if self.hist_len == self.window:
+            self.window_ones -= self.row_ones[..., r]
+        self._record(r)
+        self.row_ones[..., r] = self.ones
+        self.window_ones += self.ones
+        self.hist_pos = (r + 1) % self.window
+        self.hist_len = min(self.hist_len + 1, self.window)
+        if prof:
+            prof.lap("history")
+
+        # update flip-rate based on instantaneous majority
+        m = self.instant_majority().astype(np.int8)
+        seen = self.last_majority >= 0
+        flipped = (m != self.last_majority).astype(np.float64)
+        # in place, like every other board array (shared by blackboard_domains workers)
+        self.flip_rate[...] = np.where(seen, FLIP_DECAY * self.flip_rate + (1 - FLIP_DECAY) * flipped,
+                                       self.flip_rate)
+        self.last_majority[...] = m
+        self.t += 1
+        if prof:
+            prof.lap("flip_rate")
+
+
+def make_boards(backend, *args):
+    if backend == "array":
+        return Boards(*args)
+    if backend == "packed":
+        from blackboard_bitpacked import PackedBoards
+        return PackedBoards(*args)
+    raise ValueError(f"unknown backend {backend!r}, expected one of {BACKENDS}")
+
+
+class Ecology:
+    """Agent state for one rule set, plus its boards.
+
+    behavior[replicate, ctx, agent]; coupling[replicate, ctx, agent], or
+    [replicate, 1, agent] when the rule set shares one coupling across
+    contexts. Replicates share nothing, each draws from its own stream
+    (seed, stream, first_replicate + r), so R of them can be advanced
+    together as independent trajectories. Extra keyword knobs
+    (read_prob_b=..., write_prob=...) override the rule set. `precision`
+    picks the coupling storage (PRECISIONS).
+    """
+
+    def __init__(self, rules="v4", n_agents=N_AGENTS, bb_size=BB_SIZE, window=WINDOW,
+                 replicates=1, backend="array", kernel="auto", seed=None, stream=0,
+                 first_replicate=0, graph=None, profile=False, precision="double", **knobs):
+        rules = get_rules(rules)
+        if knobs:
+            rules = rules.override(**knobs)
+        if precision not in PRECISIONS:
+            raise ValueError(f"unknown precision {precision!r}, expected one of {sorted(PRECISIONS)}")
+        self.rules = rules
+        self.precision = precision
+        self.coupling_scale = float(COUPLING_SCALE) if precision == "fixed" else 1.0
+        self.rng = ReplicateStreams(replicates, seed, stream, first_replicate)
+        self.n_agents = n_agents
+        self.replicates = replicates
+        self.t = 0
+        self.graph = self._make_graph(graph) if graph is not None else None
+
+        # everything needed to rebuild this ecology (blackboard_checkpoint)
+        root = self.rng.root
+        self.config = dict(rules=rules.name, n_agents=n_agents, bb_size=bb_size, window=window,
+                           replicates=replicates, backend=backend, kernel=kernel,
+                           seed=root.entropy, spawn_key=list(root.spawn_key), stream=stream,
+                           first_replicate=first_replicate,
+                           graph=self.graph.spec if self.graph is not None else None,
+                           precision=precision, knobs={k: np.asarray(v).tolist() if np.ndim(v) else v
+                                  for k, v in knobs.items()})
+
+        C = rules.n_contexts
+        self.read_prob = np.array(rules.read.prob, dtype=np.float64)
+        self.mutate_prob = np.array(rules.mutate.prob if rules.mutate else (0.0,) * C)
+        self.write_prob = rules.write.prob if rules.write else 0.0
+
+        self.behavior = self.rng.integers(0, 2, (replicates, C, n_agents), dtype=np.uint8)
+        self.coupling = None
+        if rules.coupling is not None:
+            n_couplings = 1 if rules.coupling.shared else C
+            self.coupling = np.full((replicates, n_couplings, n_agents), self.coupling_scale,
+                                    dtype=PRECISIONS[precision])
+        self.boards = None
+        if rules.has_board:
+            erase = rules.decay.erase_prob if rules.decay else (0.0,) * C
+            self.boards = make_boards(backend, replicates, C, bb_size, erase, window, self.rng)
+
+        # per-phase timers (blackboard_profile); None keeps the step loop uninstrumented
+        self.profiler = None
+        if profile:
+            from blackboard_profile import PhaseProfiler
+            self.profiler = PhaseProfiler()
+            if self.boards is not None:
+                self.boards.profiler = self.profiler
+
+        # compiled sequential kernel (blackboard_kernels) when Numba is available
+        if kernel not in KERNELS:
+            raise ValueError(f"unknown kernel {kernel!r}, expected one of {KERNELS}")
+        self.kernel = "python"
+        if kernel != "python":
+            import blackboard_kernels
+            if blackboard_kernels.supports(self):
+                self.kernel = "numba"
+            elif kernel == "numba":
+                raise RuntimeError("numba kernel unavailable: needs numba installed, a board "
+                                   "rule set and backend='array'")
+
+    def _make_graph(self, graph):
+        # a blackboard_graphs.Graph, a topology name, or a spec dict like Graph.spec
+        from blackboard_graphs import SEEDED, Graph, make_graph
+        if self.rules.read.source != "neighbors":
+            raise ValueError(f"rule set {self.rules.name!r} does not read neighbors; "
+                             "graphs only apply to v0-style rule sets")
+        if not isinstance(graph, Graph):
+            spec = {"name": graph} if isinstance(graph, str) else dict(graph)
+            spec.setdefault("n", self.n_agents)
+            if spec["name"] in SEEDED and spec.get("seed") is None:
+                # derived from the ecology seed, so the graph is reproducible too
+                spec["seed"] = int(self.rng.root.generate_state(1, np.uint64)[0])
+            graph = make_graph(**spec)
+        if graph.n != self.n_agents:
+            raise ValueError(f"graph has {graph.n} agents, ecology has {self.n_agents}")
+        return graph
+
+    def step(self, mode="synchronous"):
+        if self.profiler:
+            self.profiler.start()
+        if mode == "synchronous":
+            self._step_synchronous()
+        elif mode == "sequential":
+            self._step_sequential()
+        else:
+            raise ValueError(f"unknown mode {mode!r}, expected one of {MODES}")
+        if self.boards is not None:
+            self.boards.step(self.rng)
+        self.t += 1
+
+    def _contexts(self, shape):
+        # each agent visits exactly one context, uniformly
+        C = self.rules.n_contexts
+        if C == 1:
+            return np.zeros(shape, dtype=np.intp)
+        return (self.rng.random(shape) * C).astype(np.intp)
+
+    def _neighbor_majority(self, behavior, nb, coin):
+        # majority behavior of sampled agents nb[r, ..., k]; even-k ties take `coin`
+        k = nb.shape[-1]
+        votes = np.take_along_axis(behavior, nb.reshape(len(nb), -1), axis=1)
+        votes = votes.reshape(nb.shape).sum(axis=-1, dtype=np.int64)
+        return np.where(2 * votes == k, coin, 2 * votes > k).astype(np.uint8)
+
+    def _load_coupling(self, k):
+        # stored couplings -> float64 values in [0, 1]
+        return np.divide(k, self.coupling_scale, dtype=np.float64)
+
+    def _coupling_store(self, k):
+        # float64 couplings -> storage values (rounded to the fixed-point grid)
+        if self.precision == "fixed":
+            return np.rint(k * self.coupling_scale).astype(np.uint16)
+        return k
+
+    def _update_coupling(self, k, compatible, flip_rate):
+        rule = self.rules.coupling
+        # coupling drifts down when incompatible, recovers when compatible
+        k = np.where(compatible, np.minimum(1.0, k + rule.up), np.maximum(0.0, k - rule.down))
+        if rule.flip_penalty:
+            # context instability reduces influence
+            k = np.maximum(0.0, k - rule.flip_penalty * flip_rate)
+        return k
+
+    def _step_synchronous(self):
+        R, n = self.replicates, self.n_agents
+        rules = self.rules
+        rng = self.rng
+        bb = self.boards
+
+        single = rules.n_contexts == 1
+
+        def gather(a, idx):
+            if single:
+                return np.broadcast_to(a, idx.shape)
+            return np.take_along_axis(a, idx, axis=1)
+
+        prof = self.profiler
+        ctx = self._contexts((R, n))
+        behavior = gather(self.behavior, ctx[:, None])[:, 0]
+        if prof:
+            prof.lap("contexts")
+
+        # Read: everyone sees the same start-of-step state
+        u_read = rng.random((R, n))
+        p_read = self.read_prob[ctx]
+        read = u_read < p_read
+        if rules.read.source == "neighbors":
+            # given a read (u < p), u < p/2 is a fair coin for tied polls
+            coin = u_read < p_read / 2
+            if self.graph is not None:
+                source = self.graph.majority(self.behavior[:, 0], coin)
+            else:
+                nb = sample_distinct(rng, n, rules.read.radius, (R, n))
+                source = self._neighbor_majority(self.behavior[:, 0], nb, coin)
+        else:
+            source = gather(bb.majority(), ctx)
+        behavior = np.where(read, source, behavior)
+        if prof:
+            prof.lap("read")
+
+        # Mutate
+        if rules.mutate is not None:
+            flip = rng.random((R, n)) < self.mutate_prob[ctx]
+            behavior = behavior ^ flip.astype(np.uint8)
+            if prof:
+                prof.lap("mutate")
+
+        # Compatibility drives coupling
+        strength = 1.0
+        if self.coupling is not None:
+            kctx = ctx if self.coupling.shape[1] > 1 else np.zeros_like(ctx)
+            before = self._load_coupling(gather(self.coupling, kctx[:, None])[:, 0])
+            ref = bb.instant_majority() if rules.coupling.reference == "instant" else bb.majority()
+            coupling = self._update_coupling(before, behavior == gather(ref, ctx),
+                                             gather(bb.flip_rate, ctx))
+            np.put_along_axis(self.coupling, kctx[:, None],
+                              self._coupling_store(coupling)[:, None], axis=1)
+            strength = before if rules.write.before_coupling else coupling
+            if prof:
+                prof.lap("coupling")
+
+        # Write: all imprints land at once (later agents win slot collisions)
+        if rules.write is not None:
+            write = rng.random((R, n)) < self.write_prob * strength
+            idx = rng.integers(0, bb.size, (R, n), dtype=np.intp)
+            w_rep, w_agent = np.nonzero(write)
+            bb.write(w_rep, ctx[w_rep, w_agent], idx[w_rep, w_agent], behavior[w_rep, w_agent])
+
+        if single:
+            self.behavior[:, 0] = behavior
+        else:
+            np.put_along_axis(self.behavior, ctx[:, None], behavior[:, None], axis=1)
+        if prof:
+            prof.lap("write")
+
+    def _step_sequential(self):
+        # exact per-agent ordering inside each replicate, vectorized across replicates
+        R, n = self.replicates, self.n_agents
+        rules = self.rules
+        rng = self.rng
+        bb = self.boards
+        rep = np.arange(R)
+        prof = self.profiler
+
+        def per_agent(a):
+            # draws are replicate-first; the loop wants agent-first rows
+            return np.ascontiguousarray(np.swapaxes(a, 0, 1))
+
+        # pre-draw the per-agent random numbers this step needs
+        ctx = per_agent(self._contexts((R, n)))
+        u_read = per_agent(rng.random((R, n)))
+        u_mut = per_agent(rng.random((R, n))) if rules.mutate is not None else None
+        if rules.write is not None:
+            u_write = per_agent(rng.random((R, n)))
+            idx = per_agent(rng.integers(0, bb.size, (R, n), dtype=np.intp))
+        neighbors = None
+        if rules.read.source == "neighbors" and self.graph is None:
+            # who each agent will poll; their behaviors are read at poll time
+            neighbors = per_agent(sample_distinct(rng, n, rules.read.radius, (R, n)))
+        if prof:
+            prof.lap("draws")
+
+        if self.kernel == "numba":
+            import blackboard_kernels
+            blackboard_kernels.sequential_step(self, ctx, u_read, u_mut, u_write, idx)
+            if prof:
+                prof.lap("agents_numba")
+            return
+
+        def instant(c):
+            twice = 2 * bb.ones[rep, c]
+            return np.where(twice > bb.size, 1,
+                            np.where(twice < bb.size, 0, bb.first_slot()[rep, c])).astype(np.uint8)
+
+        def write(i, c, b, k):
+            w = np.flatnonzero(u_write[i] < self.write_prob * k)
+            if w.size:
+                bb.write(w, c[w], idx[i, w], b[w], unique=True)
+            if prof:
+                prof.lap("write")
+
+        # the temporal window does not change until Boards.step(), so only
+        # the very first step (empty history) needs a fresh read per agent
+        maj = bb.majority() if bb is not None and bb.hist_len else None
+        shared = self.coupling is not None and self.coupling.shape[1] == 1
+
+        for i in range(n):
+            c = ctx[i]
+            b = self.behavior[rep, c, i]
+
+            # Read
+            if rules.read.source == "neighbors":
+                coin = u_read[i] < self.read_prob[c] / 2
+                if self.graph is not None:
+                    deg = self.graph.degree[i]
+                    twice = 2 * self.behavior[:, 0, self.graph.neighbors(i)].sum(axis=-1, dtype=np.int64)
+                    m = np.where(twice == deg, coin, twice > deg).astype(np.uint8)
+                else:
+                    m = self._neighbor_majority(self.behavior[:, 0], neighbors[i], coin)
+            else:
+                m = maj[rep, c] if maj is not None else instant(c)
+            b = np.where(u_read[i] < self.read_prob[c], m, b)
+            if prof:
+                prof.lap("read")
+
+            # Mutate
+            if u_mut is not None:
+                b = b ^ (u_mut[i] < self.mutate_prob[c]).astype(np.uint8)
+                if prof:
+                    prof.lap("mutate")
+
+            # Compatibility drives coupling; write scaled by coupling
+            if self.coupling is not None:
+                kc = 0 if shared else c
+                k = self._load_coupling(self.coupling[rep, kc, i])
+                if rules.write.before_coupling:
+                    write(i, c, b, k)
+                if rules.coupling.reference == "instant" or maj is None:
+                    ref = instant(c)
+                else:
+                    ref = maj[rep, c]
+                k = self._update_coupling(k, b == ref, bb.flip_rate[rep, c])
+                if prof:
+                    prof.lap("coupling")
+                if not rules.write.before_coupling:
+                    write(i, c, b, k)
+                self.coupling[rep, kc, i] = self._coupling_store(k)
+            elif rules.write is not None:
+                write(i, c, b, 1.0)
+
+            self.behavior[rep, c, i] = b
+
+
+# the built-in observables (blackboard_observables.register adds more)
+register("ent_agents", lambda eco: binary_entropy(eco.behavior.sum(axis=-1), eco.n_agents))
+register("ent_bb", lambda eco: eco.boards.entropy(), needs=("boards",))
+register("maj_run", lambda eco: eco.boards.instant_majority(), RunTracker, needs=("boards",),
+         value="majority")
+register("margin", lambda eco: eco.boards.majority_margin(), needs=("boards",))
+register("avg_coupling",
+         lambda eco: eco.coupling.mean(axis=-1, dtype=np.float64) / eco.coupling_scale,
+         needs=("coupling",))
+register("flip_rate", lambda eco: eco.boards.flip_rate.copy(), None, FINAL, ("boards",))
+register("min_coupling", lambda eco: np.divide(eco.coupling.min(axis=-1), eco.coupling_scale,
+                                               dtype=np.float64), None, FINAL, ("coupling",))
+
+
+def observables(eco, observe=None):
+    # fresh accumulators for the observables a run on `eco` tracks (default: every
+    # registered one that applies); snapshots are None until the end of the run
+    obs = {}
+    for name, every in sampling(eco, observe).items():
+        acc = OBSERVABLES[name].accumulator
+        obs[name] = acc(every) if acc is not None else None
+    return obs
+
+
+def _accumulates(acc):
+    # accumulators, as opposed to end-of-run snapshots (None before the end, arrays after)
+    return acc is not None and hasattr(acc, "update")
+
+
+def simulate(eco, steps, mode="synchronous", trace=None, obs=None, checkpoint=None,
+             monitor=None, observe=None):
+    # advance `eco` and stream per-step observables into online accumulators;
+    # every value is shaped (R, ctx), memory does not grow with `steps`.
+    # observe picks the observables and their sampling (blackboard_observables.sampling;
+    # default: all of them, every step). Pass the accumulators of a resumed run as `obs`
+    # to keep accumulating what they track. A blackboard_convergence monitor may stop
+    # the run early. `trace` gets every step's values of its `names` (default: all the
+    # per-step observables, the board majority as "majority"; TraceWriter, TrajectoryWriter);
+    # trace and monitor values are computed every step, sampled or not.
+    prof = eco.profiler
+    if obs is None:
+        obs = observables(eco, observe)
+    elif observe is not None:
+        raise ValueError("pass observe= for a new run only; resumed accumulators keep theirs")
+
+    # per-step observables, and values the trace or monitor reads on every step
+    sampled = [(OBSERVABLES[name], acc) for name, acc in obs.items()
+               if _accumulates(acc) and acc.every != FINAL]
+    wanted = []
+    if trace is not None:
+        names = getattr(trace, "names", None)
+        wanted += names if names is not None else [o.value for o, _ in sampled]
+    if monitor is not None:
+        wanted += monitor.observables
+    by_value = {o.value: o for o in OBSERVABLES.values()}
+    extra = [by_value[v] for v in dict.fromkeys(wanted)
+             if v in by_value and applies(by_value[v], eco)]
+
+    for _ in range(steps):
+        eco.step(mode)
+        t = eco.t - 1
+        values = {}
+        for o, acc in sampled:
+            if t % acc.every == 0:
+                values[o.value] = v = o.compute(eco)
+                acc.update(v)
+        for o in extra:
+            if o.value not in values:
+                values[o.value] = o.compute(eco)
+        if prof:
+            prof.lap("observables")
+        if trace is not None:
+            trace.write(t, **values)
+            if prof:
+                prof.lap("trace")
+        if checkpoint is not None:
+            checkpoint.write(eco, obs)
+            if prof:
+                prof.lap("checkpoint")
+        if monitor is not None:
+            done = monitor.update(eco, values)
+            if prof:
+                prof.lap("monitor")
+            if done:
+                break
+
+    # end-of-run snapshots, and accumulators sampled only then
+    for name, acc in obs.items():
+        o = OBSERVABLES[name]
+        if not _accumulates(acc):
+            obs[name] = o.compute(eco)
+        elif acc.every == FINAL:
+            obs[name] = type(acc)(FINAL)
+            obs[name].update(o.compute(eco))
+    return obs
+
+
+def memory(eco):
+    # bytes held by the state of `eco` (agents, boards, graph, RNG buffers), the
+    # agent state per agent and replicate, and the process's peak resident size
+    agents = eco.behavior.nbytes + (eco.coupling.nbytes if eco.coupling is not None else 0)
+    bb = eco.boards
+    boards = sum(getattr(bb, name).nbytes for name in bb.STATE) if bb is not None else 0
+    graph = eco.graph.nbytes() if eco.graph is not None else 0
+    rng = eco.rng._buf.nbytes
+    out = {"agents": agents, "boards": boards, "graph": graph, "rng": rng,
+           "total": agents + boards + graph + rng,
+           "bytes_per_agent": agents / (eco.n_agents * eco.replicates)}
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        out["resident"] = peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        pass  # no getrusage on Windows
+    return out
+
+
+def report_memory(eco):
+    m = memory(eco)
+    line = (f"MEMORY: {m['bytes_per_agent']:.3g} bytes/agent, state {m['total'] / 2**20:.1f} MiB "
+            f"(agents {m['agents'] / 2**20:.1f}, boards {m['boards'] / 2**20:.1f})")
+    if "resident" in m:
+        line += f", resident {m['resident'] / 2**20:.1f} MiB"
+    print(line)
+
+
+def run(rules="v4", steps=STEPS, mode="synchronous", seed=None, verbose=True, observe=None,
+        **params):
+    # observe: the observables to track (see simulate); the FIELD NOTE needs them all
+    eco = Ecology(rules, seed=seed, **params)
+    if verbose:
+        report_memory(eco)
+    obs = simulate(eco, steps, mode, observe=observe)
+    if verbose and observe is None:
+        report(obs)
+    return obs
+
+
+def report(obs, rep=0, profiler=None):
+    # the v3/v4 report (two contexts, per-context coupling) for one replicate,
+    # followed by the per-phase timings when the run was profiled
+    ent_agents = obs["ent_agents"].last[rep]
+    ent_bb = obs["ent_bb"].last[rep]
+    avg_coupling = obs["avg_coupling"]
+    margin = obs["margin"]
+    max_run_ = obs["maj_run"].best[rep]
+    flip_rate = obs["flip_rate"][rep]
+    min_coupling = obs["min_coupling"][rep]
+    avg_c, last_c = avg_coupling.mean[rep], avg_coupling.last[rep]
+    avg_m, min_m = margin.mean[rep], margin.min[rep]
+
+    print("Final agent entropy (A-behaviors):", ent_agents[0])
+    print("Final agent entropy (B-behaviors):", ent_agents[1])
+    print("Final bbA entropy:", ent_bb[0])
+    print("Final bbB entropy:", ent_bb[1])
+    print("Final average coupling (A):", last_c[0])
+    print("Final average coupling (B):", last_c[1])
+
+    print("Final bbA flip_rate:", flip_rate[0])
+    print("Final bbB flip_rate:", flip_rate[1])
+
+    print("Min coupling A:", min_coupling[0])
+    print("Min coupling B:", min_coupling[1])
+
+    print("Avg coupling A (mean):", avg_c[0])
+    print("Avg coupling B (mean):", avg_c[1])
+
+    print("Max majority run A:", max_run_[0])
+    print("Max majority run B:", max_run_[1])
+
+    print("Avg margin A:", avg_m[0])
+    print("Avg margin B:", avg_m[1])
+    print("Min margin A:", min_m[0])
+    print("Min margin B:", min_m[1])
+
+    print("\nFIELD NOTE")
+    print("A: avg_margin", round(avg_m[0], 3),
+          "min_margin", round(min_m[0], 3),
+          "avg_coupling", round(avg_c[0], 3))
+    print("B: avg_margin", round(avg_m[1], 3),
+          "min_margin", round(min_m[1], 3),
+          "avg_coupling", round(avg_c[1], 3))
+    if profiler is not None:
+        profiler.report()
+
+
+if __name__ == "__main__":
+    import sys
+    run(sys.argv[1] if len(sys.argv) > 1 else "v4",
+        mode=sys.argv[2] if len(sys.argv) > 2 else "synchronous")
@@ -0,0 +1,122 @@
+"""
+Replicate ensembles for the blackboard models (any registered rule set).
+
+Advances R independent replicates together in one batched
+(replicate x agent) state on blackboard_engine, then reduces each replicate
+to a few scalars (margin, coupling, flip_rate, max majority run) and
+summarizes them across the ensemble with confidence intervals.
+"""
+
+import numpy as np
+
+import blackboard_engine as engine
+
+REPLICATES = 1000
+Z_95 = 1.959963984540054
+
+# per-replicate observables reported in the ensemble FIELD NOTE
+SUMMARY_KEYS = ("avg_margin", "min_margin", "avg_coupling", "min_coupling",
+                "flip_rate", "max_run", "final_entropy")
+
+
+def replicate_observables(obs):
+    # per-replicate scalars from simulate() accumulators, each shaped (R, ctx);
+    # rule sets without a board or coupling, and runs that did not observe them,
+    # simply lack those entries
+    per_rep = {}
+    if "margin" in obs:
+        per_rep["avg_margin"] = obs["margin"].mean
+        per_rep["min_margin"] = obs["margin"].min
+    if "avg_coupling" in obs:
+        per_rep["avg_coupling"] = obs["avg_coupling"].mean
+    if "min_coupling" in obs:
+        per_rep["min_coupling"] = obs["min_coupling"]
+    if "flip_rate" in obs:
+        per_rep["flip_rate"] = obs["flip_rate"]
+    if "maj_run" in obs:
+        per_rep["max_run"] = obs["maj_run"].best
+    if "ent_agents" in obs:
+        per_rep["final_entropy"] = obs["ent_agents"].last
+    return per_rep
+
+
+def mean_ci(x, z=Z_95):
+    # normal-approximation CI of the mean over axis 0
+    x = np.asarray(x, dtype=np.float64)
+    n = x.shape[0]
+    mean = x.mean(axis=0)
+    sd = x.std(axis=0, ddof=1) if n > 1 else np.zeros_like(mean)
+    half = z * sd / np.sqrt(n)
+    return {"mean": mean, "sd": sd, "ci_low": mean - half, "ci_high": mean + half}
+
+
+def summarize(per_rep, z=Z_95):
+    summary = {name: mean_ci(x, z) for name, x in per_rep.items()}
+    margin = per_rep.get("avg_margin")
+    if margin is not None and margin.shape[1] >= 2:
+        # paired contrast of the first two contexts (A vs B): same replicate, same agents
+        summary["margin_a_minus_b"] = mean_ci(margin[:, 0] - margin[:, 1], z)
+        summary["frac_a_more_stable"] = float(np.mean(margin[:, 0] > margin[:, 1]))
+    return summary
+
+
+def context_value(x, c):
+    # shared couplings have a single column for every context
+    return x[min(c, len(x) - 1)]
+
+
+def run_ensemble(rules="v4", replicates=REPLICATES, steps=engine.STEPS, mode="synchronous",
+                 seed=None, verbose=True, early_stop=False, observe=None, **params):
+    # early_stop: stop once every replicate has converged (blackboard_convergence)
+    # and extrapolate the remaining steps; True or a ConvergenceMonitor.
+    # observe: the observables to track (engine.simulate); default all of them
+    eco = engine.Ecology(rules, replicates=replicates, seed=seed, **params)
+    if verbose:
+        engine.report_memory(eco)
+    monitor = None
+    if early_stop:
+        from blackboard_convergence import ConvergenceMonitor
+        monitor = early_stop if isinstance(early_stop, ConvergenceMonitor) else ConvergenceMonitor()
+    obs = engine.simulate(eco, steps, mode, monitor=monitor, observe=observe)
+    if monitor is not None:
+        monitor.extrapolate(obs, steps)
+    per_rep = replicate_observables(obs)
+    summary = summarize(per_rep)
+    if monitor is not None:
+        converged = monitor.converged_at >= 0
+        summary["convergence"] = {
+            "steps_run": eco.t, "frac_converged": float(converged.mean()),
+            "median_step": float(np.median(monitor.converged_at[converged])) if converged.any() else None}
+    if verbose:
+        report(summary, replicates, eco.rules.contexts)
+    return per_rep, summary
+
+
+def report(summary, replicates, contexts=("A", "B")):
+    print(f"ENSEMBLE FIELD NOTE ({replicates} replicates, mean [95% CI])")
+    for c, label in enumerate(contexts):
+        parts = []
+        for name in SUMMARY_KEYS:
+            if name not in summary:
+                continue
+            s = summary[name]
+            mean, lo, hi = (context_value(s[k], c) for k in ("mean", "ci_low", "ci_high"))
+            parts.append(f"{name} {mean:.3f} [{lo:.3f}, {hi:.3f}]")
+        print(f"{label}: " + "  ".join(parts))
+
+    if "margin_a_minus_b" in summary:
+        d = summary["margin_a_minus_b"]
+        a, b = contexts[:2]
+        print(f"{a}-{b} avg_margin: {d['mean']:.3f} [{d['ci_low']:.3f}, {d['ci_high']:.3f}]",
+              f"frac {a} more stable:", round(summary["frac_a_more_stable"], 3))
+    if "convergence" in summary:
+        c = summary["convergence"]
+        print(f"converged: {c['frac_converged']:.0%} of replicates, median step "
+              f"{c['median_step']}, stopped after {c['steps_run']} steps")
+
+
+if __name__ == "__main__":
+    import sys
+    run_ensemble(sys.argv[1] if len(sys.argv) > 1 else "v4",
+                 replicates=int(sys.argv[2]) if len(sys.argv) > 2 else REPLICATES,
+                 mode=sys.argv[3] if len(sys.argv) > 3 else "synchronous")
@@ -0,0 +1,131 @@
+"""
+Optional Numba kernel for the exact sequential update (v1-v4 rule sets).
+
+The sequential step is order dependent: later agents read a board that
+earlier agents just wrote, so it cannot be vectorized across agents. This
+kernel runs the same per-agent loop as Ecology._step_sequential (read the
+temporal majority, mutate, update coupling from the instantaneous majority
+and flip_rate, write) over typed arrays, one replicate after another.
+
+It consumes the random numbers Ecology has already drawn for the step, so a
+seeded run gives bit-identical results with or without Numba. When Numba is
+not installed HAVE_NUMBA is False and Ecology keeps the pure-Python path.
+Only the "array" board backend is supported; "packed" boards and the v0
+neighbor read always use the Python path.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+
+def _instant(slots, ones, r, c, size):
+    # instantaneous majority; ties go to slot 0 like Counter.most_common
+    twice = 2 * ones[r, c]
+    if twice > size:
+        return 1
+    if twice < size:
+        return 0
+    return slots[r, c, 0]
+
+
+def _sequential(behavior, coupling, slots, ones, maj, flip_rate,
+                ctx, u_read, u_mut, u_write, idx,
+                read_prob, mutate_prob, write_prob,
+                up, down, flip_penalty, instant_ref, before_coupling,
+                scale, fixed, flips):
+    # returns how many slot flips it logged in `flips` (flat keys, for the history deltas);
+    # couplings are stored as value * scale, rounded when `fixed` (Ecology precision)
+    n_reps, n_boards, n = behavior.shape
+    size = slots.shape[2]
+    shared = coupling.shape[1] == 1
+    m = 0
+
+    for r in range(n_reps):
+        for i in range(n):
+            c = ctx[i, r]
+            kc = 0 if shared else c
+            b = behavior[r, c, i]
+            k = coupling[r, kc, i] / scale
+
+            # Read: align to temporal majority (maj < 0: history still empty)
+            if u_read[i, r] < read_prob[c]:
+                b = maj[r, c] if maj[r, c] >= 0 else _instant(slots, ones, r, c, size)
+
+            # Mutate
+            if u_mut[i, r] < mutate_prob[c]:
+                b = 1 - b
+
+            # Write before the coupling update (v2)
+            if before_coupling and u_write[i, r] < write_prob * k:
+                j = idx[i, r]
+                if slots[r, c, j] != b:
+                    flips[m] = (r * n_boards + c) * size + j
+                    m += 1
+                ones[r, c] += b - slots[r, c, j]
+                slots[r, c, j] = b
+
+            # Compatibility drives coupling
+            if instant_ref or maj[r, c] < 0:
+                ref = _instant(slots, ones, r, c, size)
+            else:
+                ref = maj[r, c]
+            if b == ref:
+                k = min(1.0, k + up)
+            else:
+                k = max(0.0, k - down)
+            if flip_penalty != 0.0:
+                k = max(0.0, k - flip_penalty * flip_rate[r, c])
+
+            # Write
+            if not before_coupling and u_write[i, r] < write_prob * k:
+                j = idx[i, r]
+                if slots[r, c, j] != b:
+                    flips[m] = (r * n_boards + c) * size + j
+                    m += 1
+                ones[r, c] += b - slots[r, c, j]
+                slots[r, c, j] = b
+
+            behavior[r, c, i] = b
+            if fixed:
+                coupling[r, kc, i] = np.rint(k * scale)
+            else:
+                coupling[r, kc, i] = k
+    return m
+
+
+if HAVE_NUMBA:
+    _instant = njit(cache=True)(_instant)
+    _sequential = njit(cache=True)(_sequential)
+
+
+def supports(eco):
+    # rule sets with a board, a coupling and a write rule, on uint8 slots
+    from blackboard_engine import Boards
+    rules = eco.rules
+    return (HAVE_NUMBA and rules.read.source == "temporal"
+            and rules.coupling is not None and rules.write is not None
+            and type(eco.boards) is Boards)
+
+
+def sequential_step(eco, ctx, u_read, u_mut, u_write, idx):
+    # agent half of one exact step; the caller drew the random numbers
+    bb = eco.boards
+    rules = eco.rules
+    maj = bb.majority().astype(np.int8) if bb.hist_len else np.full(bb.ones.shape, -1, np.int8)
+    if u_mut is None:
+        u_mut = np.ones_like(u_read)
+    # at most one write per agent and replicate
+    flips = np.empty(u_read.size, dtype=np.int64)
+    m = _sequential(eco.behavior, eco.coupling, bb.slots, bb.ones, maj, bb.flip_rate,
+                    ctx, u_read, u_mut, u_write, idx,
+                    eco.read_prob, eco.mutate_prob, float(eco.write_prob),
+                    float(rules.coupling.up), float(rules.coupling.down),
+                    float(rules.coupling.flip_penalty),
+                    rules.coupling.reference == "instant", bool(rules.write.before_coupling),
+                    eco.coupling_scale, eco.precision == "fixed", flips)
+    bb._flips.append(flips[:m])
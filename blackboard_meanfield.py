@@ -0,0 +1,462 @@
+"""
+Mean-field surrogate of the synchronous board models (v2, v3/v4 rule sets).
+
+Instead of simulating agents, MeanField advances the expected state of
+an infinitely large population on finite boards, deterministically:
+
+- p[point, ctx, behavior, k]: the joint distribution of behavior and
+  coupling among the agents, on a grid of `bins` + 1 coupling values
+  (the 0.01 / 0.05 / 0.10 / 0.20 rule steps land on grid points; the
+  flip-rate penalty is split between the two nearest ones). This is a
+  master equation for the coupling: its clamping at 0 and 1, and the
+  correlation between behavior and coupling, are kept exactly.
+- s[point, ctx]: fraction of 1-slots per board, with its history window.
+- flip_rate[point, ctx]: the boards' flip-rate EMA.
+
+Every agent of a replicate reads the same board, so majorities are a
+threshold of s, not a coin per agent. The instant majority is 1 when
+s * bb_size > bb_size / 2, interpolated over one slot:
+P = clip((s - 1/2) * bb_size + 1/2, 0, 1). The temporal majority uses the
+window mean of s instead. Margin is |2s - 1|. A flip is the change of P
+from one step to the next. Board noise that pushes one replicate across
+the threshold is left out, and this is the model's one approximation
+beyond the mean field itself.
+
+One MeanField integrates a whole batch of parameter points at once (any
+knobs, plus n_agents). With Numba a point costs about 7-16 microseconds
+per step on one core (v4, 100 coupling bins; screen() of 1000 points x
+500 steps took 3.4-8 s), so a 500-step pre-screen of 10^4 points takes
+roughly 35-80 s on one core. The kernel runs the points in parallel, so
+that divides by the number of cores:
+
+    rows = screen(grid(mutate_prob_b=..., erase_prob_b=...), steps=500)
+    rows[0]["avg_margin_b"], rows[0]["avg_coupling_b"]
+
+from_ecology() starts from an Ecology's state (each replicate a point),
+and check() compares the two models step by step:
+
+    report = check("v4", steps=300, replicates=200, seed=1)
+    report["max_abs_diff"]        # per observable and context
+
+Symmetric starts (behavior = slots = 0.5) stay symmetric: a deterministic
+model does not break ties the way noise does. Start from an ecology or
+pass biased `behavior` / `slots` fractions to follow one branch; screen()
+starts its boards one slot towards 1 by default.
+"""
+
+import numpy as np
+
+import blackboard_engine as engine
+from blackboard_rules import get_rules
+
+try:
+    from numba import njit, prange
+    HAVE_NUMBA = True
+except ImportError:
+    prange = range
+    HAVE_NUMBA = False
+
+COUPLING_BINS = 100
+KERNELS = ("auto", "numpy", "numba")
+# the state integrate() records every step; the other observables follow from it
+RECORDED = ("behavior", "slots", "coupling", "flip_rate")
+OBSERVABLES = ("behavior", "slots", "coupling", "margin", "majority", "flip_rate",
+               "ent_agents", "ent_bb")
+
+
+def _entropy(p):
+    # binary entropy of a fraction, elementwise
+    return engine.binary_entropy(p, 1.0)
+
+
+def _majority(s, size):
+    # P(majority 1) of boards with 1-fraction s: the count threshold, interpolated over one slot
+    return np.clip((s - 0.5) * size + 0.5, 0.0, 1.0)
+
+
+def _derive(state, size, names):
+    # observables from the recorded state (arrays of any shape)
+    s = state["slots"]
+    values = dict(state, margin=np.abs(2 * s - 1), majority=_majority(s, size),
+                  ent_agents=_entropy(state["behavior"]), ent_bb=_entropy(s))
+    return {name: values[name] for name in names}
+
+
+def _cdf_at(cdf, x, G):
+    # coupling CDF at fractional grid position x, linear between grid points
+    if x <= -1.0:
+        return 0.0
+    if x >= G:
+        return cdf[G]
+    lo = int(np.floor(x))
+    a = cdf[lo] if lo >= 0 else 0.0
+    return a + (x - lo) * (cdf[lo + 1] - a)
+
+
+def _advance(p, s, hist, flip_rate, hist_len, hist_pos, t, steps,
+             read_prob, mutate_prob, erase_prob, write_prob, up, down, flip_penalty, n_agents,
+             size, visit, coupling, instant_ref, before_coupling,
+             rec_behavior, rec_slots, rec_coupling, rec_flip):
+    # MeanField.step() `steps` times, point by point; returns hist_len, hist_pos, t.
+    # Per-point parameters are (P, C); the rec_* arrays get the RECORDED state after
+    # every step when they have `steps` rows.
+    P, C, _, K = p.shape
+    G = K - 1
+    W = hist.shape[2]
+    record = rec_behavior.shape[0] == steps
+    # points are independent: each runs all its steps on its own thread, with its
+    # own scratch arrays and its own copy of the shared history counters
+    for i in prange(P):
+        q = np.empty((2, K))
+        moved = np.empty((2, K))
+        cu = np.empty(K)
+        cd = np.empty(K)
+        mid = np.empty(K)
+        filled = hist_len
+        pos = hist_pos
+        now = t
+        for step in range(steps):
+            for c in range(C):
+                s0 = s[i, c]
+                p_inst = min(max((s0 - 0.5) * size + 0.5, 0.0), 1.0)
+                p_temp = p_inst
+                if filled:
+                    mean = 0.0
+                    for h in range(W):
+                        mean += hist[i, c, h]
+                    mean /= filled
+                    p_temp = min(max((mean - 0.5) * size + 0.5, 0.0), 1.0)
+
+                # read the temporal majority, mutate
+                r = read_prob[i, c]
+                mu = mutate_prob[i, c]
+                for g in range(K):
+                    both = p[i, c, 0, g] + p[i, c, 1, g]
+                    q1 = (1 - r) * p[i, c, 1, g] + r * p_temp * both
+                    q0 = (1 - r) * p[i, c, 0, g] + r * (1 - p_temp) * both
+                    q[1, g] = (1 - mu) * q1 + mu * q0
+                    q[0, g] = (1 - mu) * q0 + mu * q1
+
+                # coupling moves, then expected writes of 0 and 1
+                ref = p_inst if instant_ref else p_temp
+                penalty = flip_penalty[i, c] * flip_rate[i, c] * G
+                w0 = 0.0
+                w1 = 0.0
+                for b in range(2):
+                    strength = 0.0
+                    if coupling:
+                        compatible = ref if b else 1 - ref
+                        au = 0.0
+                        ad = 0.0
+                        for g in range(K):
+                            au += q[b, g] * compatible
+                            ad += q[b, g] * (1 - compatible)
+                            cu[g] = au
+                            cd[g] = ad
+                        for g in range(G):
+                            mid[g] = (_cdf_at(cu, g - up[i, c] * G, G)
+                                      + _cdf_at(cd, g + down[i, c] * G, G))
+                        mid[G] = cu[G] + cd[G]
+                        prev = 0.0
+                        for g in range(K):
+                            cur = _cdf_at(mid, g + penalty, G) if g < G else mid[G]
+                            moved[b, g] = cur - prev
+                            prev = cur
+                            strength += (q[b, g] if before_coupling else moved[b, g]) * g / G
+                    else:
+                        for g in range(K):
+                            moved[b, g] = q[b, g]
+                            strength += q[b, g]
+                    if b:
+                        w1 = n_agents[i, c] * visit * write_prob[i, c] * strength
+                    else:
+                        w0 = n_agents[i, c] * visit * write_prob[i, c] * strength
+                for b in range(2):
+                    for g in range(K):
+                        p[i, c, b, g] = (1 - visit) * p[i, c, b, g] + visit * moved[b, g]
+
+                # the last write to a slot wins; decay gives erased slots a fair bit
+                total = w0 + w1
+                ones = w1 / total if total > 0 else 0.0
+                hit = 1 - (1 - 1 / size) ** total
+                s1 = s0 * (1 - hit) + hit * ones
+                e = erase_prob[i, c]
+                s1 = s1 * (1 - e) + e / 2
+                s[i, c] = s1
+                hist[i, c, pos] = s1
+                if now:
+                    flip = abs(min(max((s1 - 0.5) * size + 0.5, 0.0), 1.0) - p_inst)
+                    flip_rate[i, c] = 0.9 * flip_rate[i, c] + 0.1 * flip
+
+                if record:
+                    x = 0.0
+                    k = 0.0
+                    for g in range(K):
+                        x += p[i, c, 1, g]
+                        k += (p[i, c, 0, g] + p[i, c, 1, g]) * g / G
+                    rec_behavior[step, i, c] = x
+                    rec_slots[step, i, c] = s1
+                    rec_coupling[step, i, c] = k
+                    rec_flip[step, i, c] = flip_rate[i, c]
+            pos = (pos + 1) % W
+            filled = min(filled + 1, W)
+            now += 1
+    return min(hist_len + steps, W), (hist_pos + steps) % W, t + steps
+
+
+if HAVE_NUMBA:
+    _cdf_at = njit(cache=True)(_cdf_at)
+    _advance = njit(cache=True, parallel=True)(_advance)
+
+
+class MeanField:
+    """Deterministic expected dynamics for a batch of parameter points.
+
+    points: knob dicts (as for Ecology / sweeps, plus n_agents), one per
+    point; None is a single point with the rule set's own values.
+    behavior, slots: initial fractions of 1s, scalars or (points, ctx).
+    kernel: "numba" runs advance() compiled, "numpy" steps the whole batch
+    with array operations; "auto" picks Numba when it is installed.
+    """
+
+    def __init__(self, rules="v4", points=None, n_agents=engine.N_AGENTS,
+                 bb_size=engine.BB_SIZE, window=engine.WINDOW, bins=COUPLING_BINS,
+                 behavior=0.5, slots=0.5, kernel="auto"):
+        if kernel not in KERNELS:
+            raise ValueError(f"unknown kernel {kernel!r}, expected one of {KERNELS}")
+        if kernel == "numba" and not HAVE_NUMBA:
+            raise RuntimeError("numba kernel unavailable: numba is not installed")
+        self.kernel = "numba" if HAVE_NUMBA and kernel != "numpy" else "numpy"
+        base = get_rules(rules)
+        if not base.has_board:
+            raise ValueError(f"rule set {base.name!r}: the mean-field model needs a board")
+        if base.coupling is not None and base.coupling.shared:
+            raise ValueError(f"rule set {base.name!r}: shared couplings tie the contexts "
+                             "together; the mean-field model needs one coupling per context")
+        points = [dict(p) for p in points] if points is not None else [{}]
+        rules = []
+        for p in points:
+            knobs = {k: v for k, v in p.items() if k != "n_agents"}
+            if set(knobs) & {"bb_size", "window", "contexts"}:
+                raise ValueError("bb_size, window and contexts are the same for every point")
+            rules.append(base.override(**knobs) if knobs else base)
+        self.rules = base
+        self.points = points
+        self.size = bb_size
+        self.window = window
+        self.bins = bins
+        C = base.n_contexts
+        P = len(points)
+
+        # per-point parameters, (P, C) or (P, 1)
+        def per_context(get):
+            return np.array([get(r) for r in rules], dtype=np.float64).reshape(P, -1)
+
+        self.n_agents = np.array([p.get("n_agents", n_agents) for p in points],
+                                 dtype=np.float64).reshape(P, 1)
+        self.read_prob = per_context(lambda r: r.read.prob)
+        self.mutate_prob = per_context(lambda r: r.mutate.prob if r.mutate else (0.0,) * C)
+        self.erase_prob = per_context(lambda r: r.decay.erase_prob if r.decay else (0.0,) * C)
+        self.write_prob = per_context(lambda r: r.write.prob if r.write else 0.0)
+        coupling = base.coupling
+        self.up = per_context(lambda r: r.coupling.up if coupling else 0.0)
+        self.down = per_context(lambda r: r.coupling.down if coupling else 0.0)
+        self.flip_penalty = per_context(lambda r: r.coupling.flip_penalty if coupling else 0.0)
+
+        self._grid = np.arange(bins + 1, dtype=np.float64)
+        self.k = self._grid / bins
+        x = np.broadcast_to(np.asarray(behavior, dtype=np.float64), (P, C))
+        self.p = np.zeros((P, C, 2, bins + 1))
+        self.p[..., 0, bins] = 1 - x      # everyone starts fully coupled, like Ecology
+        self.p[..., 1, bins] = x
+        self.s = np.array(np.broadcast_to(np.asarray(slots, dtype=np.float64), (P, C)))
+        self.hist = np.zeros((P, C, window))
+        self.hist_len = 0
+        self.hist_pos = 0
+        self.flip_rate = np.zeros((P, C))
+        self.t = 0
+
+    @classmethod
+    def from_ecology(cls, eco, bins=COUPLING_BINS, kernel="auto"):
+        # one point per replicate, starting from the ecology's current state
+        R, C, n = eco.behavior.shape
+        bb = eco.boards
+        mf = cls(eco.rules, points=[{}] * R, n_agents=n, bb_size=bb.size, window=bb.window,
+                 bins=bins, kernel=kernel)
+        if eco.coupling is not None:
+            kbin = np.rint(eco._load_coupling(eco.coupling) * bins).astype(np.int64)
+        else:
+            kbin = np.full(eco.behavior.shape, bins, dtype=np.int64)
+        board = np.arange(R * C).reshape(R, C, 1)
+        key = (board * 2 + eco.behavior) * (bins + 1) + kbin
+        mf.p = np.bincount(key.ravel(), minlength=R * C * 2 * (bins + 1)).reshape(mf.p.shape) / n
+        mf.s = bb.ones / bb.size
+        mf.hist = bb.row_ones / bb.size
+        mf.hist_len, mf.hist_pos = bb.hist_len, bb.hist_pos
+        mf.flip_rate = bb.flip_rate.copy()
+        mf.t = eco.t
+        return mf
+
+    def majority(self, s):
+        return _majority(s, self.size)
+
+    def window_mean(self):
+        if not self.hist_len:
+            return self.s
+        return self.hist.sum(axis=-1) / self.hist_len
+
+    def _shift(self, cdf, delta):
+        # coupling CDFs over the grid after moving all mass by `delta` bins, clamped to
+        # [0, bins]; a fractional move splits mass between the two nearest grid points,
+        # which is linear interpolation of the CDF
+        G = self.bins
+        x = np.clip(self._grid - delta, -1, G)
+        lo = np.floor(x)
+        frac = x - lo
+        lo = lo.astype(np.intp) + 1
+        padded = np.concatenate([np.zeros(cdf.shape[:-1] + (1,)), cdf], axis=-1)
+        a = np.take_along_axis(padded, lo, axis=-1)
+        b = np.take_along_axis(padded, np.minimum(lo + 1, G + 1), axis=-1)
+        out = a + frac * (b - a)
+        out[..., G] = cdf[..., G]
+        return out
+
+    def advance(self, steps, record=False):
+        # `steps` synchronous steps; with record, the RECORDED state after every step,
+        # shaped (steps, points, ctx)
+        shape = (steps,) + self.s.shape if record else (0,) + self.s.shape
+        out = {name: np.empty(shape) for name in RECORDED}
+        if self.kernel == "numba":
+            rules = self.rules
+            coupling = rules.coupling is not None
+            per_point = [np.ascontiguousarray(np.broadcast_to(a, self.s.shape)) for a in (
+                self.read_prob, self.mutate_prob, self.erase_prob, self.write_prob,
+                self.up, self.down, self.flip_penalty, self.n_agents)]
+            self.hist_len, self.hist_pos, self.t = _advance(
+                self.p, self.s, self.hist, self.flip_rate, self.hist_len, self.hist_pos,
+                self.t, steps, *per_point, float(self.size), 1.0 / rules.n_contexts,
+                coupling, coupling and rules.coupling.reference == "instant",
+                bool(rules.write and rules.write.before_coupling),
+                *(out[name] for name in RECORDED))
+            return out if record else None
+        for t in range(steps):
+            self.step()
+            if record:
+                values = self.observables()
+                for name in RECORDED:
+                    out[name][t] = values[name]
+        return out if record else None
+
+    def step(self):
+        # one synchronous step: agents against the start-of-step boards, then the boards
+        # (the numpy form of advance(); the kernel runs the same arithmetic per point)
+        rules = self.rules
+        C = rules.n_contexts
+        visit = 1.0 / C
+        p_inst = self.majority(self.s)
+        p_temp = self.majority(self.window_mean()) if self.hist_len else p_inst
+
+        # read the temporal majority, mutate
+        both = self.p.sum(axis=-2, keepdims=True)
+        read = self.read_prob[..., None, None]
+        q = (1 - read) * self.p + read * np.stack([1 - p_temp, p_temp], axis=-1)[..., None] * both
+        mut = self.mutate_prob[..., None, None]
+        q = (1 - mut) * q + mut * q[..., ::-1, :]
+
+        # coupling moves up when compatible with the reference majority, down otherwise,
+        # minus the flip-rate penalty; writes scale with the coupling before or after
+        if rules.coupling is not None:
+            ref = p_inst if rules.coupling.reference == "instant" else p_temp
+            compatible = np.stack([1 - ref, ref], axis=-1)[..., None]
+            G = self.bins
+            up = self._shift(np.cumsum(q * compatible, axis=-1), self.up[..., None, None] * G)
+            down = self._shift(np.cumsum(q * (1 - compatible), axis=-1),
+                               -self.down[..., None, None] * G)
+            penalty = (self.flip_penalty * self.flip_rate)[..., None, None] * G
+            moved = np.diff(self._shift(up + down, -penalty), axis=-1, prepend=0.0)
+            strength = ((q if rules.write.before_coupling else moved) * self.k).sum(axis=-1)
+        else:
+            moved = q
+            strength = q.sum(axis=-1)
+        self.p = (1 - visit) * self.p + visit * moved
+
+        # expected writes of 0 and 1 per board; the last write to a slot wins
+        writes = (self.n_agents * visit * self.write_prob)[..., None] * strength
+        total = writes.sum(axis=-1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ones = np.where(total > 0, writes[..., 1] / total, 0.0)
+        hit = 1 - (1 - 1 / self.size) ** total
+        s = self.s * (1 - hit) + hit * ones
+        # decay: erased slots get a fair bit
+        e = self.erase_prob
+        self.s = s * (1 - e) + e / 2
+
+        # history window, then the flip rate of the instant majority (not on the first step)
+        self.hist[..., self.hist_pos] = self.s
+        self.hist_pos = (self.hist_pos + 1) % self.window
+        self.hist_len = min(self.hist_len + 1, self.window)
+        if self.t:
+            flip = np.abs(self.majority(self.s) - p_inst)
+            self.flip_rate = engine.FLIP_DECAY * self.flip_rate + (1 - engine.FLIP_DECAY) * flip
+        self.t += 1
+
+    def observables(self):
+        # the expected state, every value shaped (points, ctx)
+        state = {"behavior": self.p[..., 1, :].sum(axis=-1), "slots": self.s.copy(),
+                 "coupling": (self.p.sum(axis=-2) * self.k).sum(axis=-1),
+                 "flip_rate": self.flip_rate.copy()}
+        return _derive(state, self.size, OBSERVABLES)
+
+
+def integrate(mf, steps, names=OBSERVABLES):
+    # advance `mf` by `steps`; every observable after every step, shaped (steps, points, ctx)
+    return _derive(mf.advance(steps, record=True), mf.size, names)
+
+
+def screen(points, rules="v4", steps=engine.STEPS, n_agents=engine.N_AGENTS,
+           bb_size=engine.BB_SIZE, window=engine.WINDOW, behavior=0.5, slots=None):
+    # surrogate sweep: one flat row per point with the knobs and, per context, the
+    # time-averaged margin / coupling and the final flip_rate / behavior fraction,
+    # named like blackboard_sweep results (avg_margin_b, ...); the boards start one
+    # slot from a tie unless `slots` says otherwise
+    if slots is None:
+        slots = 0.5 + 1 / bb_size
+    mf = MeanField(rules, points, n_agents, bb_size, window, behavior=behavior, slots=slots)
+    traj = integrate(mf, steps, ("margin", "coupling", "flip_rate", "behavior"))
+    summary = {"avg_margin": traj["margin"].mean(axis=0),
+               "avg_coupling": traj["coupling"].mean(axis=0),
+               "flip_rate": traj["flip_rate"][-1], "behavior": traj["behavior"][-1]}
+    labels = [c.lower() for c in mf.rules.contexts]
+    rows = []
+    for i, p in enumerate(mf.points):
+        row = dict(p)
+        for name, v in summary.items():
+            row.update((f"{name}_{label}", float(v[i, c])) for c, label in enumerate(labels))
+        rows.append(row)
+    return rows
+
+
+def check(rules="v4", steps=engine.STEPS, replicates=100, seed=None, **params):
+    # the agent-based ensemble and the mean-field model from the same initial states:
+    # per-step ensemble means of margin, flip_rate, agent entropy and coupling for both
+    eco = engine.Ecology(rules, replicates=replicates, seed=seed, **params)
+    mf = MeanField.from_ecology(eco)
+    names = ("margin", "flip_rate", "ent_agents") + (("coupling",) if eco.coupling is not None else ())
+    agents = {name: np.empty((steps, eco.rules.n_contexts)) for name in names}
+    field = {name: np.empty((steps, eco.rules.n_contexts)) for name in names}
+    n = eco.n_agents
+    for t in range(steps):
+        eco.step("synchronous")
+        mf.advance(1)
+        values = mf.observables()
+        agents["margin"][t] = eco.boards.majority_margin().mean(axis=0)
+        agents["flip_rate"][t] = eco.boards.flip_rate.mean(axis=0)
+        agents["ent_agents"][t] = engine.binary_entropy(eco.behavior.sum(axis=-1), n).mean(axis=0)
+        if eco.coupling is not None:
+            agents["coupling"][t] = (eco.coupling.mean(axis=-1, dtype=np.float64)
+                                     / eco.coupling_scale).mean(axis=0)
+        for name in names:
+            field[name][t] = values[name].mean(axis=0)
+    return {"agents": agents, "mean_field": field,
+            "max_abs_diff": {name: np.abs(agents[name] - field[name]).max(axis=0)
+                             for name in names}}
@@ -0,0 +1,191 @@
+"""
+Constant-memory observables for long blackboard runs.
+
+Instead of appending every step to a list and reducing at the end, runs feed
+each observable into an online accumulator. Memory stays fixed no matter how
+many steps are taken. Accumulators work on plain floats and elementwise on
+NumPy arrays (blackboard_engine, one value per replicate/context).
+
+- RunningStats: last, mean, min, max, variance (Welford)
+- RunTracker: longest run of equal consecutive values (max majority run)
+- WindowedTrace: the last `maxlen` values only
+- TraceWriter: optional decimated CSV trace on disk (every k-th step)
+
+Observables are named and registered (blackboard_engine registers the
+built-in ones), and a run computes only those it is asked for, each at its
+own sampling interval: every step, every k-th step, or FINAL (once, at the
+end). Accumulators keep their interval in `every`.
+
+    register("frac_b", lambda eco: eco.behavior.mean(axis=-1, dtype=np.float64))
+    obs = engine.simulate(eco, 10_000, observe={"margin": 10, "min_coupling": FINAL})
+"""
+
+import csv
+from collections import deque, namedtuple
+
+import numpy as np
+
+FINAL = "final"
+
+# name -> Observable, in registration order
+OBSERVABLES = {}
+
+
+class RunningStats:
+    def __init__(self, every=1):
+        self.every = every
+        self.n = 0
+        self.total = 0
+        self.last = None
+        self.min = None
+        self.max = None
+        self._mean = 0.0
+        self._m2 = 0.0
+        # samples added by extrapolation, outside the Welford sums
+        self._extrapolated = 0
+
+    def update(self, x):
+        self.n += 1
+        # plain running sum so mean == sum(xs) / len(xs) exactly
+        self.total = self.total + x
+        self.last = x
+        if self.n == 1:
+            self.min = x
+            self.max = x
+        else:
+            self.min = np.minimum(self.min, x)
+            self.max = np.maximum(self.max, x)
+        delta = x - self._mean
+        self._mean = self._mean + delta / (self.n - self._extrapolated)
+        self._m2 = self._m2 + delta * (x - self._mean)
+
+    @property
+    def mean(self):
+        return self.total / self.n
+
+    @property
+    def var(self):
+        # sample variance of the values actually seen
+        n = self.n - self._extrapolated
+        if n < 2:
+            return self._m2 * 0.0
+        return self._m2 / (n - 1)
+
+
+class RunTracker:
+    # longest run of equal consecutive values, like max_run() over the full list
+    # (of the sampled values, when sampled every k steps)
+    def __init__(self, every=1):
+        self.every = every
+        self.last = None
+        self.current = None
+        self.best = None
+
+    def update(self, x):
+        if self.last is None:
+            self.current = np.ones_like(x, dtype=np.int64) if np.ndim(x) else 1
+            self.best = self.current
+        else:
+            same = x == self.last
+            if np.ndim(x):
+                self.current = np.where(same, self.current + 1, 1)
+                self.best = np.maximum(self.best, self.current)
+            else:
+                self.current = self.current + 1 if same else 1
+                self.best = max(self.best, self.current)
+        self.last = x
+
+
+class WindowedTrace:
+    def __init__(self, maxlen):
+        self.values = deque(maxlen=maxlen)
+
+    def update(self, x):
+        self.values.append(np.copy(x) if np.ndim(x) else x)
+
+    def array(self):
+        return np.asarray(self.values)
+
+
+class TraceWriter:
+    """Append every `every`-th step of some named scalar/array observables to a CSV."""
+
+    def __init__(self, path, names, every=1):
+        self.every = every
+        self.names = list(names)
+        self._file = open(path, "w", newline="")
+        self._writer = csv.writer(self._file)
+        self._header = False
+
+    def write(self, step, **values):
+        if step % self.every:
+            return
+        flat = {}
+        for name in self.names:
+            v = np.ravel(values[name])
+            if v.size == 1:
+                flat[name] = v[0]
+            else:
+                flat.update((f"{name}_{i}", x) for i, x in enumerate(v))
+        if not self._header:
+            self._writer.writerow(["step"] + list(flat))
+            self._header = True
+        self._writer.writerow([step] + list(flat.values()))
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+Observable = namedtuple("Observable", "name compute accumulator every needs value")
+
+
+def register(name, compute, accumulator=RunningStats, every=1, needs=(), value=None):
+    # compute(eco) -> the current value, shaped (R, ctx). accumulator: the online
+    # accumulator class it feeds (built with the sampling interval, which it keeps in
+    # `every`), or None for a snapshot taken at the end and kept as is.
+    # every: default sampling interval in steps, or FINAL. needs: Ecology attributes
+    # that must not be None ("boards", "coupling"); runs without them leave it out.
+    # value: its name in the per-step values a trace or monitor gets (default `name`).
+    if accumulator is None and every != FINAL:
+        raise ValueError(f"observable {name!r}: snapshots are taken at the end only")
+    OBSERVABLES[name] = Observable(name, compute, accumulator, every, tuple(needs),
+                                   value or name)
+    return OBSERVABLES[name]
+
+
+def get_observable(name):
+    try:
+        return OBSERVABLES[name]
+    except KeyError:
+        raise ValueError(f"unknown observable {name!r}, expected one of "
+                         f"{tuple(OBSERVABLES)}") from None
+
+
+def applies(observable, eco):
+    return all(getattr(eco, need) is not None for need in observable.needs)
+
+
+def sampling(eco, observe=None):
+    # {name: every} for a run on `eco`: None is every registered observable that applies,
+    # a list of names takes their default intervals, a dict sets them
+    if observe is None:
+        return {o.name: o.every for o in OBSERVABLES.values() if applies(o, eco)}
+    if not isinstance(observe, dict):
+        observe = {name: get_observable(name).every for name in observe}
+    out = {}
+    for name, every in observe.items():
+        o = get_observable(name)
+        if not applies(o, eco):
+            raise ValueError(f"observable {name!r} needs {' and '.join(o.needs)}, which this "
+                             "ecology does not have")
+        if every != FINAL and (o.accumulator is None or int(every) != every or every < 1):
+            raise ValueError(f"observable {name!r}: every must be FINAL"
+                             + ("" if o.accumulator is None else " or a positive step count"))
+        out[name] = every
+    return out
@@ -0,0 +1,128 @@
+"""
+Counter-based, block-generated random streams for the blackboard core.
+
+Every replicate gets its own Philox stream, addressed by (seed, stream,
+replicate) through SeedSequence spawn keys rather than by spawning in order.
+Replicate r therefore sees the same numbers whether it runs alone, inside a
+batch of 1,000, or in another worker process (first_replicate=r), and a sweep
+point or worker can take its own `stream` id.
+
+Uniforms are generated per replicate in blocks and handed out as slices of
+an (R, block) buffer, so a step costs a few array slices instead of one
+generator call per decision. The block shrinks as R grows to keep the buffer
+near BUFFER_VALUES; chunking never changes which numbers a replicate sees. Indices are floor(u * high),
+whose bias (< high / 2**53) is far below anything a run can resolve.
+
+ReplicateStreams is used where the engine used a numpy Generator; every
+request must put the replicate axis first. Processes that draw a variable
+amount per step (event-driven decay) use side streams instead: a Philox key
+per replicate and lane, with the counter set from a block index, so block b
+is generated directly and nothing but the step number needs saving.
+"""
+
+import hashlib
+
+import numpy as np
+
+BUFFER_VALUES = 1 << 22     # ~32 MB of float64 across all replicates
+MIN_BLOCK = 256
+MAX_BLOCK = 1 << 16
+
+
+def stream_id(*labels):
+    # stable integer stream id from arbitrary labels (sweep keys, worker names)
+    blob = "\x1f".join(str(x) for x in labels).encode()
+    return int.from_bytes(hashlib.sha256(blob).digest()[:8], "little")
+
+
+def replicate_generator(seed, stream, replicate):
+    # the generator for one replicate; seed is an int, a SeedSequence or None
+    root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    ss = np.random.SeedSequence(root.entropy, spawn_key=tuple(root.spawn_key) + (stream, replicate))
+    return np.random.Generator(np.random.Philox(ss))
+
+
+def block_generator(key, block):
+    # counter-based access: block b of the side stream keyed by `key`
+    return np.random.Generator(np.random.Philox(key=key, counter=[0, 0, block, 0]))
+
+
+class ReplicateStreams:
+    def __init__(self, replicates, seed=None, stream=0, first_replicate=0, block=None):
+        # resolve seed=None once so every replicate shares the same root entropy
+        self.root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.stream = stream
+        self.replicates = replicates
+        self.first_replicate = first_replicate
+        self.block = block or int(np.clip(BUFFER_VALUES // max(replicates, 1), MIN_BLOCK, MAX_BLOCK))
+        self.generators = [replicate_generator(self.root, stream, first_replicate + r)
+                           for r in range(replicates)]
+        self._buf = np.empty((replicates, 0))
+        self._pos = 0
+
+    def side_keys(self, tag, lanes):
+        # (R, lanes, 2) Philox keys for side stream `tag`, independent of the main streams
+        keys = np.empty((self.replicates, lanes, 2), dtype=np.uint64)
+        for r in range(self.replicates):
+            ss = np.random.SeedSequence(self.root.entropy, spawn_key=tuple(self.root.spawn_key)
+                                        + (self.stream, self.first_replicate + r, tag))
+            keys[r] = ss.generate_state(2 * lanes, np.uint64).reshape(lanes, 2)
+        return keys
+
+    def _take(self, m):
+        # next m uniforms of every replicate, shape (R, m)
+        if self._pos + m > self._buf.shape[1]:
+            # fresh buffer every refill: earlier slices may still be in use this step
+            rest = self._buf[:, self._pos:]
+            buf = np.empty((self.replicates, rest.shape[1] + max(self.block, m - rest.shape[1])))
+            buf[:, :rest.shape[1]] = rest
+            for g, row in zip(self.generators, buf):
+                g.random(out=row[rest.shape[1]:])
+            self._buf = buf
+            self._pos = 0
+        out = self._buf[:, self._pos:self._pos + m]
+        self._pos += m
+        return out
+
+    def _check(self, shape):
+        shape = tuple(shape)
+        if not shape or shape[0] != self.replicates:
+            raise ValueError(f"draw shape {shape} must start with the replicate axis "
+                             f"({self.replicates})")
+        return shape
+
+    def random(self, shape):
+        shape = self._check(shape)
+        return self._take(int(np.prod(shape[1:], dtype=np.int64))).reshape(shape)
+
+    def integers(self, low, high, shape, dtype=np.int64):
+        # uniform integers in [low, high); `high` may be an array broadcasting to shape
+        u = self.random(shape)
+        return (low + np.floor(u * (np.asarray(high) - low))).astype(dtype)
+
+    # -- checkpointing --
+
+    def state(self):
+        # flat arrays, one row per replicate: Philox counters/keys/buffers plus
+        # the uniforms generated but not handed out yet
+        states = [g.bit_generator.state for g in self.generators]
+        return {"counter": np.array([s["state"]["counter"] for s in states], dtype=np.uint64),
+                "key": np.array([s["state"]["key"] for s in states], dtype=np.uint64),
+                "buffer": np.array([s["buffer"] for s in states], dtype=np.uint64),
+                "buffer_pos": np.array([s["buffer_pos"] for s in states], dtype=np.int64),
+                "has_uint32": np.array([s["has_uint32"] for s in states], dtype=np.int64),
+                "uinteger": np.array([s["uinteger"] for s in states], dtype=np.uint64),
+                "uniforms": self._buf[:, self._pos:].copy()}
+
+    def set_state(self, state):
+        for r, g in enumerate(self.generators):
+            g.bit_generator.state = {
+                "bit_generator": "Philox",
+                "state": {"counter": np.array(state["counter"][r]), "key": np.array(state["key"][r])},
+                "buffer": np.array(state["buffer"][r]),
+                "buffer_pos": int(state["buffer_pos"][r]),
+                "has_uint32": int(state["has_uint32"][r]),
+                "uinteger": int(state["uinteger"][r]),
+            }
+        self._buf = np.array(state["uniforms"], dtype=np.float64)
+        self._pos = 0
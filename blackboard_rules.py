@@ -0,0 +1,187 @@
+"""
+Rule sets for the minimal blackboard models, v0 through v4.
+
+Each version is one registered RuleSet made of five rules. They all run on
+the same state arrays in blackboard_engine:
+
+- read:     where an agent takes its behavior from ("temporal" board majority
+            or the majority of `radius` random "neighbors"), with what probability
+- mutate:   per-context probability of flipping the behavior
+- coupling: what the behavior is compared against ("instant" or "temporal"
+            majority), step sizes, flip-rate penalty, one coupling per
+            context or one shared across contexts
+- write:    probability of imprinting behavior on a random slot (scaled by
+            coupling), and whether the write happens before the coupling update
+- decay:    per-board erase probability
+
+A rule that does not apply to a version is None (v0 has no board at all).
+Per-context values are tuples indexed like `contexts`. Any rule set runs with
+any number of contexts: override(contexts=100) cycles its per-context values
+over 100 boards, and per-context knobs then take length-C arrays.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+ReadRule = namedtuple("ReadRule", "source prob radius", defaults=(None,))
+MutateRule = namedtuple("MutateRule", "prob")
+CouplingRule = namedtuple("CouplingRule", "reference up down flip_penalty shared",
+                          defaults=(0.0, False))
+WriteRule = namedtuple("WriteRule", "prob before_coupling", defaults=(False,))
+DecayRule = namedtuple("DecayRule", "erase_prob")
+
+
+class RuleSet:
+    def __init__(self, name, contexts, read, mutate=None, coupling=None,
+                 write=None, decay=None, description=""):
+        self.name = name
+        self.contexts = tuple(contexts)
+        self.read = read
+        self.mutate = mutate
+        self.coupling = coupling
+        self.write = write
+        self.decay = decay
+        self.description = description
+
+    @property
+    def n_contexts(self):
+        return len(self.contexts)
+
+    @property
+    def has_board(self):
+        return self.read.source == "temporal"
+
+    def override(self, contexts=None, **knobs):
+        """Copy with some parameters replaced.
+
+        contexts: a number of contexts (labelled C0, C1, ...) or a sequence of
+        labels; the existing per-context values are repeated cyclically.
+        Per-context knobs take the context as a suffix (`read_prob_b`) or no
+        suffix to set every context, with one value (`erase_prob=0.02`) or
+        one per context (`erase_prob=[...]`). Scalars: write_prob, radius,
+        coupling_up, coupling_down, flip_penalty.
+        """
+        fields = {"read": self.read, "mutate": self.mutate, "coupling": self.coupling,
+                  "write": self.write, "decay": self.decay}
+        if contexts is not None:
+            return self._with_contexts(contexts).override(**knobs)
+        per_context = {"read_prob": ("read", "prob"),
+                       "mutate_prob": ("mutate", "prob"),
+                       "erase_prob": ("decay", "erase_prob")}
+        scalar = {"write_prob": ("write", "prob"),
+                  "radius": ("read", "radius"),
+                  "coupling_up": ("coupling", "up"),
+                  "coupling_down": ("coupling", "down"),
+                  "flip_penalty": ("coupling", "flip_penalty")}
+        labels = [c.lower() for c in self.contexts]
+
+        for knob, value in knobs.items():
+            base, _, suffix = knob.rpartition("_")
+            if knob in scalar:
+                rule, attr = scalar[knob]
+                target = None
+            elif knob in per_context:
+                (rule, attr), target = per_context[knob], None
+            elif base in per_context and suffix in labels:
+                (rule, attr), target = per_context[base], labels.index(suffix)
+            else:
+                raise ValueError(f"unknown knob {knob!r} for rule set {self.name!r}")
+
+            if fields[rule] is None:
+                if knob == "mutate_prob" or base == "mutate_prob":
+                    fields[rule] = MutateRule((0.0,) * self.n_contexts)
+                else:
+                    raise ValueError(f"rule set {self.name!r} has no {rule} rule for {knob!r}")
+            if attr in ("prob", "erase_prob") and rule != "write":
+                old = list(getattr(fields[rule], attr))
+                if target is not None:
+                    old[target] = value
+                elif np.ndim(value):
+                    if len(value) != len(old):
+                        raise ValueError(f"{knob!r} needs {len(old)} values, got {len(value)}")
+                    old = [float(v) for v in value]
+                else:
+                    old = [value] * len(old)
+                value = tuple(old)
+            fields[rule] = fields[rule]._replace(**{attr: value})
+
+        return RuleSet(self.name, self.contexts, description=self.description, **fields)
+
+    def _with_contexts(self, contexts):
+        if isinstance(contexts, int):
+            contexts = [f"C{i}" for i in range(contexts)]
+        contexts = tuple(contexts)
+        if not contexts:
+            raise ValueError("need at least one context")
+        C = len(contexts)
+        if self.read.source == "neighbors" and C > 1:
+            raise ValueError(f"rule set {self.name!r} reads neighbors and has a single context")
+
+        def cycle(values):
+            return tuple(values[i % len(values)] for i in range(C))
+
+        read = self.read._replace(prob=cycle(self.read.prob))
+        mutate = self.mutate and self.mutate._replace(prob=cycle(self.mutate.prob))
+        decay = self.decay and self.decay._replace(erase_prob=cycle(self.decay.erase_prob))
+        return RuleSet(self.name, contexts, read, mutate, self.coupling, self.write, decay,
+                       self.description)
+
+    def __repr__(self):
+        return (f"RuleSet({self.name!r}, contexts={self.contexts}, read={self.read}, "
+                f"mutate={self.mutate}, coupling={self.coupling}, write={self.write}, "
+                f"decay={self.decay})")
+
+
+RULESETS = {}
+
+
+def register(rules, *aliases):
+    for name in (rules.name,) + aliases:
+        RULESETS[name] = rules
+    return rules
+
+
+def get_rules(rules):
+    # accept a RuleSet or a registered name
+    if isinstance(rules, RuleSet):
+        return rules
+    try:
+        return RULESETS[rules]
+    except KeyError:
+        raise ValueError(f"unknown rule set {rules!r}, expected one of {sorted(RULESETS)}") from None
+
+
+V0 = register(RuleSet(
+    "v0", contexts=("A",),
+    read=ReadRule("neighbors", prob=(0.95,), radius=5),
+    description="majority of 5 random agents, adopted unless noise (5%)",
+))
+
+V1 = register(RuleSet(
+    "v1", contexts=("A", "B"),
+    read=ReadRule("temporal", prob=(0.95, 0.95)),
+    coupling=CouplingRule("temporal", up=0.05, down=0.10, shared=True),
+    write=WriteRule(prob=0.30),
+    decay=DecayRule(erase_prob=(0.01, 0.05)),
+    description="two contexts, one shared coupling, align to temporal majority",
+))
+
+V2 = register(RuleSet(
+    "v2", contexts=("A",),
+    read=ReadRule("temporal", prob=(0.95,)),
+    coupling=CouplingRule("temporal", up=0.05, down=0.10),
+    write=WriteRule(prob=0.30, before_coupling=True),
+    decay=DecayRule(erase_prob=(0.02,)),
+    description="single board, write then check compatibility",
+))
+
+V4 = register(RuleSet(
+    "v4", contexts=("A", "B"),
+    read=ReadRule("temporal", prob=(0.30, 0.10)),
+    mutate=MutateRule(prob=(0.005, 0.03)),
+    coupling=CouplingRule("instant", up=0.01, down=0.20, flip_penalty=0.2),
+    write=WriteRule(prob=0.30),
+    decay=DecayRule(erase_prob=(0.01, 0.03)),
+    description="two-context ecology with drift and context-specific assimilation",
+), "v3", "v3_1")
@@ -0,0 +1,186 @@
+"""
+Parallel, resumable parameter sweeps over the blackboard knobs.
+
+A sweep is a list of parameter dicts (see grid()) for one rule set. Points
+are fanned out over a process pool, and every finished point is appended to
+a SQLite results store keyed by a hash of its full configuration. Restarting the
+same sweep after a crash skips the points that are already in the store.
+
+    points = grid(mutate_prob_b=[0.01, 0.03, 0.1], erase_prob_b=[0.01, 0.03, 0.05])
+    run_sweep(points, "sweep.db", replicates=100)
+    rows = load_results("sweep.db")
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import blackboard_engine as engine
+import blackboard_ensemble as ensemble
+from blackboard_rng import stream_id
+from blackboard_rules import get_rules
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    params TEXT NOT NULL,
+    result TEXT NOT NULL,
+    elapsed REAL NOT NULL,
+    finished_at REAL NOT NULL
+)
+"""
+
+# Ecology knobs the sweep sets for every point itself (run_sweep(replicates=...),
+# the per-point stream); they cannot be sweep axes
+RUN_KNOBS = ("replicates", "stream", "first_replicate")
+
+
+def point_rules(rules, params):
+    # the rule set a point runs; raises ValueError for anything it cannot take
+    # engine.SIZE_KNOBS go to Ecology(); everything else is a rule-set knob
+    # (read_prob_b, mutate_prob_a, erase_prob_b, write_prob, ...)
+    for k in params:
+        if k in RUN_KNOBS:
+            raise ValueError(f"{k!r} is set by the sweep, not per point; "
+                             f"point parameters cannot include any of {RUN_KNOBS}")
+    knobs = {k: v for k, v in params.items() if k not in engine.SIZE_KNOBS}
+    return get_rules(rules).override(**knobs)
+
+
+def grid(**axes):
+    # cartesian product of knob values -> list of parameter dicts
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*axes.values())]
+
+
+def point_config(rules, params, steps, mode, replicates, seed, early_stop=False, observe=None):
+    # the full description of one run; anything that changes the result goes here
+    config = {"rules": rules, "params": dict(sorted(params.items())), "steps": steps,
+              "mode": mode, "replicates": replicates, "seed": seed}
+    # early_stop and observe are only present when set, so keys of earlier sweeps stay valid
+    if early_stop:
+        config["early_stop"] = True
+    if observe is not None:
+        config["observe"] = observe if isinstance(observe, dict) else list(observe)
+    return config
+
+
+def point_key(config):
+    blob = json.dumps(config, sort_keys=True, default=float)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def run_point(config):
+    # worker entry point: one parameter set -> flat dict of summary numbers
+    key = point_key(config)
+    # per-point stream: the sweep seed plus the point's own hash, so every point
+    # gets independent but reproducible streams regardless of worker order
+    stream = stream_id(key)
+    t0 = time.perf_counter()
+    _, summary = ensemble.run_ensemble(config["rules"], replicates=config["replicates"],
+                                       steps=config["steps"], mode=config["mode"],
+                                       seed=config["seed"], stream=stream, verbose=False,
+                                       early_stop=config.get("early_stop", False),
+                                       observe=config.get("observe"), **config["params"])
+    elapsed = time.perf_counter() - t0
+
+    result = {}
+    labels = [c.lower() for c in point_rules(config["rules"], config["params"]).contexts]
+    for name in ensemble.SUMMARY_KEYS:
+        if name not in summary:
+            continue
+        s = summary[name]
+        # one column per context, or a single column for shared couplings
+        cols = labels if len(s["mean"]) == len(labels) else ["all"]
+        for c, label in enumerate(cols):
+            result[f"{name}_{label}"] = float(s["mean"][c])
+            result[f"{name}_{label}_ci_low"] = float(s["ci_low"][c])
+            result[f"{name}_{label}_ci_high"] = float(s["ci_high"][c])
+    if "convergence" in summary:
+        result.update(summary["convergence"])
+    return key, result, elapsed
+
+
+def open_store(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(SCHEMA)
+    conn.commit()
+    return conn
+
+
+def completed_keys(conn):
+    return {row[0] for row in conn.execute("SELECT key FROM results")}
+
+
+def run_sweep(points, db_path, rules="v4", steps=engine.STEPS, mode="synchronous",
+              replicates=1, seed=0, workers=None, verbose=True, early_stop=False, observe=None):
+    # early_stop=True stops each point once all its replicates have converged;
+    # observe=["margin"] (or {name: every}) tracks only those observables
+    workers = workers or os.cpu_count() or 1
+    configs = [point_config(rules, p, steps, mode, replicates, seed, early_stop, observe)
+               for p in points]
+    for cfg in configs:
+        point_rules(rules, cfg["params"])
+
+    conn = open_store(db_path)
+    done = completed_keys(conn)
+    todo = {}
+    for cfg in configs:
+        key = point_key(cfg)
+        if key not in done:
+            todo[key] = cfg
+    if verbose:
+        print(f"sweep: {len(configs)} points, {len(configs) - len(todo)} already done, "
+              f"{len(todo)} to run on {workers} workers")
+
+    # results are written by this process only, one row per finished point
+    finished = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(run_point, cfg) for cfg in todo.values()]
+            for fut in as_completed(futures):
+                key, result, elapsed = fut.result()
+                conn.execute("INSERT OR IGNORE INTO results VALUES (?, ?, ?, ?, ?)",
+                             (key, json.dumps(todo[key]), json.dumps(result),
+                              elapsed, time.time()))
+                conn.commit()
+                finished += 1
+                if verbose:
+                    print(f"[{finished}/{len(todo)}] {todo[key]['params']} ({elapsed:.2f}s)")
+    finally:
+        conn.close()
+    return finished
+
+
+def load_results(db_path, keys=None):
+    # one flat dict per point: knobs, run settings and summary numbers;
+    # keys=[...] (point_key values) picks those points, in that order
+    conn = open_store(db_path)
+    rows = {}
+    try:
+        for key, params, result, elapsed in conn.execute(
+                "SELECT key, params, result, elapsed FROM results ORDER BY finished_at"):
+            cfg = json.loads(params)
+            row = dict(cfg["params"])
+            row.update(rules=cfg["rules"], steps=cfg["steps"], mode=cfg["mode"],
+                       replicates=cfg["replicates"], seed=cfg["seed"], elapsed=elapsed)
+            row.update(json.loads(result))
+            rows[key] = row
+    finally:
+        conn.close()
+    if keys is None:
+        return list(rows.values())
+    return [rows[k] for k in keys if k in rows]
+
+
+if __name__ == "__main__":
+    import sys
+    db = sys.argv[1] if len(sys.argv) > 1 else "sweep_results.db"
+    run_sweep(grid(mutate_prob_b=[0.005, 0.01, 0.03, 0.1],
+                   erase_prob_b=[0.01, 0.03, 0.05]),
+              db, replicates=50)
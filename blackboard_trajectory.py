@@ -0,0 +1,371 @@
+"""
+Chunked, compressed trajectory store for full per-step traces.
+
+A trajectory is a directory with one column per observable (ent_agents,
+ent_bb, avg_coupling, margin, majority, ...), each shaped [step, replicate,
+ctx]. A column is cut into chunks of `chunk_steps` steps x `chunk_replicates`
+replicates. Chunks are appended to the column's .dat file, byte-shuffled and
+zlib-compressed (codec="zlib") or raw (codec="none"). The column's .idx
+file has one record per chunk, (step chunk, replicate chunk, offset, nbytes,
+steps), and the newest record of a chunk wins. meta.json holds the layout and
+the number of committed steps. It is replaced atomically after the chunks it
+covers are written, so a reader never sees a half-written step.
+
+Writing: TrajectoryWriter is a simulate() trace. It buffers one chunk of
+steps and flushes it when full (and on flush() / close()). Opening an
+existing store appends to it; writing a step that is already stored (a run
+resumed from an earlier checkpoint) drops that step and everything after it.
+
+    with TrajectoryWriter("runs/v4.traj", attrs=eco.config) as traj:
+        engine.simulate(eco, 100_000, trace=traj)
+
+Reading: Trajectory memory-maps the .dat files and decodes only the chunks
+a slice touches, so a column can be much larger than RAM.
+
+    traj = Trajectory("runs/v4.traj")
+    margin = traj["margin"]                     # lazy, shape (steps, R, C)
+    b = margin[-1000:, :, 1]                    # decodes the last chunk(s) only
+    for steps, reps, block in margin.iter_chunks():
+        ...                                     # out-of-core reductions
+    traj.refresh()                              # pick up steps a running writer added
+"""
+
+import json
+import os
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+FORMAT = 1
+CHUNK_STEPS = 256
+CHUNK_REPLICATES = 256
+CODECS = ("zlib", "none")
+LEVEL = 3
+CACHE_CHUNKS = 32   # decoded chunks kept per column
+
+# chunk records in <name>.idx: step chunk, replicate chunk, offset, nbytes, steps
+RECORD = 5
+
+
+def _encode(a, codec, level):
+    a = np.ascontiguousarray(a)
+    if codec == "none":
+        return a.tobytes()
+    # byte shuffle: the k-th bytes of all values together, which zlib compresses far better
+    raw = a.view(np.uint8).reshape(-1, a.itemsize).T.tobytes()
+    return zlib.compress(raw, level)
+
+
+def _decode(buf, dtype, shape, codec):
+    if codec == "none":
+        return np.frombuffer(buf, dtype).reshape(shape)
+    raw = np.frombuffer(zlib.decompress(buf), np.uint8)
+    return np.ascontiguousarray(raw.reshape(dtype.itemsize, -1).T).view(dtype).reshape(shape)
+
+
+def _paths(path, name):
+    return os.path.join(path, name + ".dat"), os.path.join(path, name + ".idx")
+
+
+def _read_meta(path):
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    if meta["format"] != FORMAT:
+        raise ValueError(f"{path}: trajectory format {meta['format']}, expected {FORMAT}")
+    return meta
+
+
+def _read_index(idx_path):
+    # (step chunk, replicate chunk) -> (offset, nbytes, steps), newest record wins
+    records = np.fromfile(idx_path, dtype=np.int64) if os.path.exists(idx_path) else []
+    index = {}
+    for i, j, offset, nbytes, steps in np.reshape(records, (-1, RECORD)).tolist():
+        index[i, j] = (offset, nbytes, steps)
+    return index
+
+
+class TrajectoryWriter:
+    """simulate(..., trace=TrajectoryWriter(path)) stores every `every`-th step.
+
+    names: the observables to keep (None: everything simulate() passes).
+    dtype: store floating columns in this dtype (e.g. np.float32) instead.
+    attrs: JSON-able metadata kept with the trajectory (e.g. eco.config).
+    """
+
+    def __init__(self, path, names=None, every=1, chunk_steps=CHUNK_STEPS,
+                 chunk_replicates=CHUNK_REPLICATES, codec="zlib", level=LEVEL, dtype=None,
+                 attrs=None):
+        if codec not in CODECS:
+            raise ValueError(f"unknown codec {codec!r}, expected one of {CODECS}")
+        self.path = path
+        self.names = list(names) if names is not None else None
+        self.dtype = np.dtype(dtype) if dtype is not None else None
+        os.makedirs(path, exist_ok=True)
+        self._buf = {}
+        self._rows = 0          # buffered steps, following the committed ones
+        if os.path.exists(os.path.join(path, "meta.json")):
+            self.meta = _read_meta(path)
+            self._reload(self.meta["steps"])
+        else:
+            self.meta = {"format": FORMAT, "every": every, "start": None, "steps": 0,
+                         "replicates": None, "chunk_steps": chunk_steps,
+                         "chunk_replicates": chunk_replicates, "codec": codec, "level": level,
+                         "columns": {}, "attrs": attrs or {}}
+
+    @property
+    def steps(self):
+        # steps written so far, committed or buffered
+        return self.meta["steps"] + self._rows
+
+    def _setup(self, step, values):
+        meta = self.meta
+        meta["start"] = step
+        names = self.names if self.names is not None else list(values)
+        for name in names:
+            v = np.asarray(values[name])
+            dtype = v.dtype
+            if self.dtype is not None and np.issubdtype(dtype, np.floating):
+                dtype = self.dtype
+            meta["columns"][name] = {"dtype": dtype.str, "shape": list(v.shape[1:])}
+            if meta["replicates"] is None:
+                meta["replicates"] = len(v)
+            elif len(v) != meta["replicates"]:
+                raise ValueError(f"{name!r} has {len(v)} replicates, expected {meta['replicates']}")
+
+    def _alloc(self):
+        meta = self.meta
+        for name, col in meta["columns"].items():
+            self._buf[name] = np.zeros((meta["chunk_steps"], meta["replicates"]) + tuple(col["shape"]),
+                                       dtype=col["dtype"])
+
+    def _reload(self, row):
+        # make `row` the next step to write; the partial chunk before it goes back into the buffer
+        meta = self.meta
+        cs = meta["chunk_steps"]
+        first = row // cs * cs
+        self._alloc()
+        if row > first:
+            with Trajectory(self.path) as traj:
+                for name in meta["columns"]:
+                    self._buf[name][:row - first] = traj[name][first:row]
+        meta["steps"] = first
+        self._rows = row - first
+
+    def write(self, step, **values):
+        meta = self.meta
+        if meta["start"] is None:
+            self._setup(step, values)
+            self._alloc()
+        offset = step - meta["start"]
+        if offset % meta["every"]:
+            return
+        row = offset // meta["every"]
+        if row < 0 or row > self.steps:
+            raise ValueError(f"step {step} does not follow the {self.steps} stored steps "
+                             f"(start {meta['start']}, every {meta['every']})")
+        if row < self.steps:
+            if row < meta["steps"]:
+                self._reload(row)
+            else:
+                self._rows = row - meta["steps"]
+        for name, buf in self._buf.items():
+            buf[self._rows] = values[name]
+        self._rows += 1
+        if self._rows == meta["chunk_steps"]:
+            self.flush()
+
+    def flush(self):
+        # append the buffered steps as chunks, then commit them in meta.json
+        meta = self.meta
+        if meta["start"] is None:
+            return
+        cs, cr = meta["chunk_steps"], meta["chunk_replicates"]
+        i = meta["steps"] // cs
+        n = self._rows
+        if n:
+            for name, buf in self._buf.items():
+                dat_path, idx_path = _paths(self.path, name)
+                records = []
+                with open(dat_path, "ab") as dat:
+                    for j, lo in enumerate(range(0, meta["replicates"], cr)):
+                        blob = _encode(buf[:n, lo:lo + cr], meta["codec"], meta["level"])
+                        records.append((i, j, dat.tell(), len(blob), n))
+                        dat.write(blob)
+                with open(idx_path, "ab") as idx:
+                    np.asarray(records, dtype=np.int64).tofile(idx)
+        committed = meta["steps"] + n
+        if n == cs:
+            meta["steps"], self._rows = committed, 0
+        tmp = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(dict(meta, steps=committed), f)
+        os.replace(tmp, os.path.join(self.path, "meta.json"))
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Column:
+    """One observable of a Trajectory, shape (steps, replicates, ...), decoded on demand.
+
+    Basic indexing: ints and slices on the step and replicate axes, anything
+    NumPy takes on the trailing axes.
+    """
+
+    def __init__(self, traj, name):
+        self.name = name
+        self._traj = traj
+        col = traj.meta["columns"][name]
+        self.dtype = np.dtype(col["dtype"])
+        self._trail = tuple(col["shape"])
+        self._cache = OrderedDict()
+        self._mmap = None
+        self.refresh()
+
+    def refresh(self):
+        dat_path, idx_path = _paths(self._traj.path, self.name)
+        self._index = _read_index(idx_path)
+        self._mmap = None
+        if os.path.exists(dat_path) and os.path.getsize(dat_path):
+            self._mmap = np.memmap(dat_path, dtype=np.uint8, mode="r")
+        self._cache.clear()
+
+    @property
+    def shape(self):
+        return (self._traj.steps, self._traj.replicates) + self._trail
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def chunk(self, i, j):
+        # decoded chunk (i, j): its steps x replicates block, read-only
+        key = (i, j)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        meta = self._traj.meta
+        offset, nbytes, stored = self._index[key]
+        reps = min(meta["chunk_replicates"], self._traj.replicates - j * meta["chunk_replicates"])
+        block = _decode(self._mmap[offset:offset + nbytes], self.dtype,
+                        (stored, reps) + self._trail, meta["codec"])
+        # a chunk rewritten after a resume may hold steps past the committed ones
+        block = block[:self._traj.steps - i * meta["chunk_steps"]]
+        self._cache[key] = block
+        if len(self._cache) > CACHE_CHUNKS:
+            self._cache.popitem(last=False)
+        return block
+
+    def iter_chunks(self, steps=slice(None), replicates=slice(None)):
+        # (step slice, replicate slice, block) for every chunk overlapping the selection
+        cs, cr = self._traj.meta["chunk_steps"], self._traj.meta["chunk_replicates"]
+        t0, t1, _ = steps.indices(self.shape[0])
+        r0, r1, _ = replicates.indices(self.shape[1])
+        for i in range(t0 // cs, -(-t1 // cs)):
+            a, b = max(t0, i * cs), min(t1, (i + 1) * cs)
+            for j in range(r0 // cr, -(-r1 // cr)):
+                c, d = max(r0, j * cr), min(r1, (j + 1) * cr)
+                block = self.chunk(i, j)[a - i * cs:b - i * cs, c - j * cr:d - j * cr]
+                yield slice(a, b), slice(c, d), block
+
+    def __getitem__(self, key):
+        key = key if isinstance(key, tuple) else (key,)
+        if any(k is Ellipsis for k in key[:2]):
+            raise IndexError("use explicit step and replicate indices instead of ...")
+        head = list(key[:2]) + [slice(None)] * (2 - len(key[:2]))
+        rest = key[2:]
+        picks = []
+        for k, n in zip(head, self.shape[:2]):
+            if isinstance(k, slice):
+                picks.append(np.arange(n)[k])
+            else:
+                k = int(k)
+                if not -n <= k < n:
+                    raise IndexError(f"index {k} out of range for {self.name!r} axis of length {n}")
+                picks.append(np.array([k % n]))
+        rows, cols = picks
+
+        cs, cr = self._traj.meta["chunk_steps"], self._traj.meta["chunk_replicates"]
+        out = np.empty((len(rows), len(cols)) + self._trail, dtype=self.dtype)
+        for i in np.unique(rows // cs):
+            ri = np.flatnonzero(rows // cs == i)
+            for j in np.unique(cols // cr):
+                ci = np.flatnonzero(cols // cr == j)
+                block = self.chunk(i, j)
+                out[np.ix_(ri, ci)] = block[np.ix_(rows[ri] - i * cs, cols[ci] - j * cr)]
+        out = out[(slice(None), slice(None)) + rest]
+        squeeze = tuple(a for a, k in enumerate(head) if not isinstance(k, slice))
+        return out.squeeze(axis=squeeze) if squeeze else out
+
+    def __array__(self, dtype=None, copy=None):
+        a = self[:, :]
+        return a if dtype is None else a.astype(dtype)
+
+
+class Trajectory:
+    """Read side of a trajectory store: traj[name] is a lazy Column."""
+
+    def __init__(self, path):
+        self.path = path
+        self._columns = {}
+        self.refresh()
+
+    def refresh(self):
+        # re-read meta.json and the chunk indexes (steps a running writer committed since)
+        self.meta = _read_meta(self.path)
+        for col in self._columns.values():
+            col.refresh()
+
+    @property
+    def names(self):
+        return list(self.meta["columns"])
+
+    @property
+    def steps(self):
+        return self.meta["steps"]
+
+    @property
+    def replicates(self):
+        return self.meta["replicates"] or 0
+
+    @property
+    def attrs(self):
+        return self.meta["attrs"]
+
+    def step_numbers(self):
+        # simulation step of every stored row
+        return self.meta["start"] + self.meta["every"] * np.arange(self.steps)
+
+    def __getitem__(self, name):
+        if name not in self.meta["columns"]:
+            raise KeyError(f"no column {name!r}; have {self.names}")
+        if name not in self._columns:
+            self._columns[name] = Column(self, name)
+        return self._columns[name]
+
+    def __contains__(self, name):
+        return name in self.meta["columns"]
+
+    def nbytes(self):
+        # bytes on disk (all chunk versions, including superseded ones)
+        return sum(os.path.getsize(p) for name in self.names for p in _paths(self.path, name)
+                   if os.path.exists(p))
+
+    def close(self):
+        self._columns = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,40 +1,46 @@
-import random
-import numpy as np
-from collections import Counter
+"""
+V0: agents copy the majority of 5 random agents (no blackboard), with noise.
+Runs on the shared core (blackboard_engine, rule set "v0").
+TOPOLOGY polls fixed graph neighbors instead (see blackboard_graphs).
+run() returns the agent entropy after every step, as the original script
+did; run_obs() returns the engine's observable accumulators.
+"""
+
+import blackboard_engine as engine
 
 N_AGENTS = 50
 STEPS = 500
 NEIGHBOR_RADIUS = 5
 NOISE = 0.05
+TOPOLOGY = None  # None: fully mixed; "ring", "grid", "erdos_renyi", "small_world"
 
-class Agent:
-    def __init__(self):
-        self.behavior = random.choice([0, 1])
+MODE = "sequential"  # exact script semantics; "synchronous" is the fast approximation
 
-    def update(self, population):
-        neighbors = random.sample(population, NEIGHBOR_RADIUS)
-        majority = Counter(a.behavior for a in neighbors).most_common(1)[0][0]
 
-        if random.random() > NOISE:
-            self.behavior = majority
+class EntropyHistory:
+    # simulate() trace keeping the agent entropy of every step
+    names = ["ent_agents"]
 
-def entropy(distribution):
-    total = sum(distribution.values())
-    probs = [v / total for v in distribution.values()]
-    return -sum(p * np.log2(p) for p in probs if p > 0)
+    def __init__(self):
+        self.history = []
 
-def run():
-    agents = [Agent() for _ in range(N_AGENTS)]
-    history = []
+    def write(self, step, **values):
+        self.history.append(float(values["ent_agents"][0, 0]) + 0.0)   # no -0.0
 
-    for _ in range(STEPS):
-        for agent in agents:
-            agent.update(agents)
 
-        dist = Counter(a.behavior for a in agents)
-        history.append(entropy(dist))
+def run_obs(trace=None):
+    # the engine's observable accumulators for one run
+    eco = engine.Ecology("v0", n_agents=N_AGENTS, radius=NEIGHBOR_RADIUS,
+                         read_prob=1 - NOISE, graph=TOPOLOGY)
+    return engine.simulate(eco, STEPS, MODE, trace)
+
+
+def run():
+    # agent entropy after every step, like the original script
+    trace = EntropyHistory()
+    run_obs(trace)
+    return trace.history
 
-    return history
 
 if __name__ == "__main__":
     h = run()
@@ -0,0 +1,18 @@
+import numpy as np
+import pytest
+
+import blackboard_analysis as analysis
+
+
+@pytest.mark.parametrize("width", [5, analysis.FLIP_LOOP_WIDTH // 2])
+@pytest.mark.parametrize("decay", [0.0, 0.5, 0.9, 0.99, 1.0])
+def test_flip_rate_matches_recurrence(decay, width):
+    # long enough to span several closed-form blocks; the wide traces take the step loop
+    rng = np.random.default_rng(0)
+    m = (rng.random((3000, width, 2)) < 0.05).cumsum(axis=0) % 2
+    ref = np.zeros(m.shape)
+    for t in range(1, len(m)):
+        ref[t] = decay * ref[t - 1] + (1 - decay) * (m[t] != m[t - 1])
+    np.testing.assert_allclose(analysis.flip_rate(m, decay=decay), ref, rtol=1e-12, atol=1e-15)
+    np.testing.assert_allclose(analysis.flip_rate(np.moveaxis(m, 0, 1), axis=1, decay=decay),
+                               np.moveaxis(ref, 0, 1), rtol=1e-12, atol=1e-15)
@@ -0,0 +1,41 @@
+import numpy as np
+
+import blackboard_engine as engine
+from blackboard_convergence import ConvergenceMonitor
+from blackboard_observables import RunningStats
+
+STEPS = 5000
+
+
+def stopped_run():
+    eco = engine.Ecology("v4", replicates=4, seed=1)
+    monitor = ConvergenceMonitor(window=50, patience=1)
+    obs = engine.simulate(eco, STEPS, monitor=monitor)
+    assert monitor.n_converged == 4 and eco.t < STEPS
+    return eco, monitor, obs
+
+
+def test_extrapolate_extends_mean_but_not_var():
+    eco, monitor, obs = stopped_run()
+    acc = obs["margin"]
+    ran = {field: np.copy(getattr(acc, field)) for field in ("var", "min", "max", "total")}
+    monitor.extrapolate(obs, STEPS)
+
+    assert acc.n == STEPS
+    # the skipped steps sit at the last block mean
+    level = monitor._block_means["margin"]
+    np.testing.assert_allclose(acc.total, ran["total"] + (STEPS - eco.t) * level)
+    # var, min and max still describe the steps actually run
+    np.testing.assert_array_equal(acc.var, ran["var"])
+    np.testing.assert_array_equal(acc.min, ran["min"])
+    np.testing.assert_array_equal(acc.max, ran["max"])
+
+
+def test_running_stats_var_after_extrapolation():
+    xs = np.random.default_rng(0).random((40, 3))
+    acc = RunningStats()
+    for x in xs:
+        acc.update(x)
+    acc.n += 1000
+    acc._extrapolated += 1000
+    np.testing.assert_allclose(acc.var, xs.var(axis=0, ddof=1))
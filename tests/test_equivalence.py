@@ -0,0 +1,148 @@
+"""
+Pins the equivalences the engine relies on: storage backends, the compiled
+sequential kernel, checkpoint resume, domain decomposition and the
+delta-encoded history all reproduce the plain computation bit for bit, and
+the majority tie-breaks match the Counter.most_common of the original
+scripts.
+
+    python -m pytest -q tests
+"""
+
+from collections import Counter, deque
+
+import numpy as np
+import pytest
+
+import blackboard_engine as engine
+from blackboard_checkpoint import Checkpointer, latest, load
+from blackboard_domains import DomainEcology
+
+STEPS = 60
+
+
+def run(steps=STEPS, mode="synchronous", **kw):
+    eco = engine.Ecology(replicates=3, seed=7, **kw)
+    return eco, engine.simulate(eco, steps, mode)
+
+
+def assert_same_obs(a, b):
+    assert list(a) == list(b)
+    for name in a:
+        x, y = a[name], b[name]
+        if hasattr(x, "update"):
+            for field in ("total", "last", "min", "max", "best", "current", "n"):
+                if hasattr(x, field):
+                    np.testing.assert_array_equal(getattr(x, field), getattr(y, field))
+        else:
+            np.testing.assert_array_equal(x, y)
+
+
+def assert_same_state(a, b):
+    np.testing.assert_array_equal(a.behavior, b.behavior)
+    if a.coupling is not None:
+        np.testing.assert_array_equal(a.coupling, b.coupling)
+    if a.boards is not None:
+        np.testing.assert_array_equal(a.boards.bits(), b.boards.bits())
+        np.testing.assert_array_equal(a.boards.flip_rate, b.boards.flip_rate)
+
+
+@pytest.mark.parametrize("rules", ["v1", "v2", "v4"])
+@pytest.mark.parametrize("mode", engine.MODES)
+def test_packed_matches_array(rules, mode):
+    # bb_size over one word, so slots straddle uint64 words
+    a, obs_a = run(rules=rules, mode=mode, bb_size=80, backend="array", kernel="python")
+    b, obs_b = run(rules=rules, mode=mode, bb_size=80, backend="packed", kernel="python")
+    assert_same_state(a, b)
+    for age in range(a.boards.hist_len):
+        np.testing.assert_array_equal(a.boards.row_bits(age), b.boards.row_bits(age))
+    assert_same_obs(obs_a, obs_b)
+
+
+@pytest.mark.parametrize("rules", ["v0", "v2", "v4"])
+def test_checkpoint_resume_matches_uninterrupted(rules, tmp_path):
+    full, obs_full = run(2 * STEPS, "sequential", rules=rules)
+
+    eco = engine.Ecology(rules, replicates=3, seed=7)
+    engine.simulate(eco, STEPS, "sequential", checkpoint=Checkpointer(str(tmp_path), STEPS))
+    eco, obs = load(latest(str(tmp_path)))
+    assert eco.t == STEPS
+    obs = engine.simulate(eco, STEPS, "sequential", obs=obs)
+    assert_same_state(full, eco)
+    assert_same_obs(obs_full, obs)
+
+
+def _domain_run(workers):
+    with DomainEcology("v4", n_agents=200, replicates=2, chunk=32, workers=workers,
+                       seed=3) as eco:
+        obs = engine.simulate(eco, 30)
+        state = (eco.behavior.copy(), eco.coupling.copy(), eco.boards.bits().copy())
+    return state, obs
+
+
+def test_domains_independent_of_workers():
+    (state_1, obs_1), (state_3, obs_3) = _domain_run(1), _domain_run(3)
+    for x, y in zip(state_1, state_3):
+        np.testing.assert_array_equal(x, y)
+    assert_same_obs(obs_1, obs_3)
+
+
+@pytest.mark.parametrize("backend", engine.BACKENDS)
+def test_row_bits_match_full_window(backend):
+    eco = engine.Ecology("v4", replicates=2, seed=5, bb_size=70, window=9, backend=backend,
+                         erase_prob_a=0.2, erase_prob_b=0.4)
+    bb = eco.boards
+    window = deque(maxlen=bb.window)
+    for _ in range(40):
+        eco.step("sequential")
+        window.append(bb.bits().copy())
+        assert bb.hist_len == len(window)
+        for age, row in enumerate(window):
+            np.testing.assert_array_equal(bb.row_bits(age), row)
+        np.testing.assert_array_equal(bb.window_ones, np.sum(window, axis=(0, -1)))
+
+
+def most_common(xs):
+    return Counter(xs).most_common(1)[0][0]
+
+
+def test_max_run_matches_python():
+    rng = np.random.default_rng(1)
+    xs = rng.integers(0, 2, (300, 4, 3))
+    for r, c in np.ndindex(4, 3):
+        series = xs[:, r, c].tolist()
+        best = cur = 1
+        for prev, x in zip(series, series[1:]):
+            cur = cur + 1 if x == prev else 1
+            best = max(best, cur)
+        assert engine.max_run(xs)[r, c] == best
+
+
+def test_majority_tie_breaks_match_counter():
+    # even board size and window: ties are frequent
+    eco = engine.Ecology("v4", replicates=4, seed=2, bb_size=4, window=2)
+    bb = eco.boards
+    window = deque(maxlen=bb.window)
+    ties = 0
+    for _ in range(50):
+        eco.step("sequential")
+        window.append(bb.bits().copy())
+        bits = bb.bits()
+        instant, temporal = bb.instant_majority(), bb.majority()
+        for r, c in np.ndindex(bb.ones.shape):
+            assert instant[r, c] == most_common(bits[r, c].tolist())
+            flat = [x for row in window for x in row[r, c].tolist()]
+            assert temporal[r, c] == most_common(flat)
+            ties += 2 * sum(flat) == len(flat)
+    assert ties
+
+
+@pytest.mark.parametrize("rules", ["v1", "v2", "v4"])
+@pytest.mark.parametrize("precision", sorted(engine.PRECISIONS))
+def test_numba_kernel_matches_python(rules, precision):
+    # v1: shared coupling; v2: writes scaled by the coupling before its update
+    pytest.importorskip("numba")
+    a, obs_a = run(rules=rules, mode="sequential", kernel="python", precision=precision)
+    b, obs_b = run(rules=rules, mode="sequential", kernel="numba", precision=precision)
+    assert (a.kernel, b.kernel) == ("python", "numba")
+    assert_same_state(a, b)
+    assert_same_obs(obs_a, obs_b)
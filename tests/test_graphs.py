@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+import blackboard_graphs as graphs
+
+
+def edge_keys(g):
+    rows = np.repeat(np.arange(g.n), g.degree)
+    return rows * g.n + g.indices
+
+
+@pytest.mark.parametrize("n, mean_degree", [(6, 5), (8, 6), (50, 30), (1000, 4)])
+def test_erdos_renyi_has_exactly_m_edges(n, mean_degree):
+    for seed in range(5):
+        m = graphs._rng(seed).binomial(n * (n - 1) // 2, mean_degree / (n - 1))
+        assert graphs.erdos_renyi(n, mean_degree, seed).n_edges == m
+
+
+def test_erdos_renyi_rejects_impossible_degree():
+    with pytest.raises(ValueError, match="mean_degree"):
+        graphs.erdos_renyi(4, 5)
+
+
+@pytest.mark.parametrize("n, k, beta", [(6, 4, 1.0), (10, 4, 1.0), (1000, 6, 0.3)])
+def test_small_world_rewiring_keeps_a_simple_graph(n, k, beta):
+    # from_edges drops self-loops and duplicates, so any would show as lost edges
+    for seed in range(5):
+        g = graphs.small_world(n, k, beta, seed)
+        assert g.n_edges == n * k // 2
+        assert len(np.unique(edge_keys(g))) == len(g.indices)
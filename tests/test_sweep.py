@@ -0,0 +1,11 @@
+import pytest
+
+import blackboard_sweep as sweep
+
+
+@pytest.mark.parametrize("knob", sweep.RUN_KNOBS)
+def test_run_knobs_are_not_sweep_axes(knob, tmp_path):
+    with pytest.raises(ValueError, match=knob):
+        sweep.run_sweep(sweep.grid(**{knob: [2]}), str(tmp_path / "sweep.db"), steps=5,
+                        workers=1, verbose=False)
+    assert not (tmp_path / "sweep.db").exists()